@@ -0,0 +1,61 @@
+"""Benchmark the XHTML conversion with a growing number of processes.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_convert.py [--chapters 20000] [--jobs 1 2 4 8]
+
+The synthetic novel of ``bench_store.py`` is packed once and converted with
+each number of jobs, the outputs must be the same.
+
+"""
+
+import argparse
+import hashlib
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from bench_store import make_novel
+
+from getnovel.utils.file import XhtmlFileConverter
+from getnovel.utils.store import PackStore
+
+
+def digest(directory: Path) -> str:
+    """Hash the XHTML files of a directory."""
+    h = hashlib.sha1()  # noqa: S324
+    for path in sorted(directory.glob("*.xhtml")):
+        h.update(path.name.encode() + path.read_bytes())
+    return h.hexdigest()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    logging.getLogger("getnovel").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp) / "raw"
+        raw.mkdir()
+        with PackStore(raw) as store:
+            for index, text in make_novel(args.chapters, args.lines).items():
+                store.write(index, text)
+        base = None
+        for jobs in args.jobs:
+            result = Path(tmp) / f"converted-{jobs}"
+            start = time.perf_counter()
+            XhtmlFileConverter(raw=raw).process(result=result, jobs=jobs)
+            seconds = time.perf_counter() - start
+            assert digest(result) == (base := base or digest(result))  # noqa: S101
+            print(  # noqa: T201
+                f"jobs {jobs:3}: {seconds:7.2f} s"
+                f" {args.chapters / seconds:9.1f} chapters/s",
+            )
+
+
+if __name__ == "__main__":
+    main()
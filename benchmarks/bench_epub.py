@@ -0,0 +1,72 @@
+"""Benchmark the epub build with each compression level and number of jobs.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_epub.py [--chapters 5000] [--jobs 1 2 4] [--level fast max]
+
+The synthetic novel of ``bench_store.py`` is packed once, every epub is built
+from scratch and must hold the same chapters.
+
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from zipfile import ZipFile
+
+from bench_store import make_novel
+
+from getnovel.utils.epub import EpubMaker
+from getnovel.utils.store import PackStore
+
+
+def chapters(epub: Path) -> dict[str, bytes]:
+    """Read the chapters of an epub."""
+    with ZipFile(epub) as f_zip:
+        assert f_zip.testzip() is None  # noqa: S101
+        return {
+            name: f_zip.read(name)
+            for name in f_zip.namelist()
+            if name.startswith("OEBPS/Text/") and name[11].isdigit()
+        }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--level", nargs="+", default=["fast", "max"])
+    args = parser.parse_args()
+    logging.getLogger("getnovel").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp) / "raw"
+        raw.mkdir()
+        (raw / "foreword.txt").write_text(
+            "Bench\nAuthor\nTypes\nhttps://example.com\nForeword.",
+            encoding="utf-8",
+        )
+        with PackStore(raw) as store:
+            for index, text in make_novel(args.chapters, args.lines).items():
+                store.write(index, text)
+        base = None
+        for level in args.level:
+            for jobs in args.jobs:
+                result = Path(tmp) / f"epub-{level}-{jobs}"
+                result.mkdir()
+                start = time.perf_counter()
+                EpubMaker(raw, "vi").process(result=result, jobs=jobs, level=level)
+                seconds = time.perf_counter() - start
+                epub = result / "bench.epub"
+                assert chapters(epub) == (base := base or chapters(epub))  # noqa: S101
+                print(  # noqa: T201
+                    f"level {level:>4} jobs {jobs:3}: {seconds:7.2f} s"
+                    f" {epub.stat().st_size / 1024**2:8.2f} MiB",
+                )
+
+
+if __name__ == "__main__":
+    main()
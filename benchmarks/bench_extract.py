@@ -0,0 +1,83 @@
+"""Benchmark the extraction of a chapter: item loader against the fast path.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_extract.py [--nodes 600] [--seconds 3]
+
+A piaotian-like page with many text nodes is parsed and turned into a
+Chapter item, the page is parsed again in every round like in a crawl.
+
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from scrapy.http import HtmlResponse, Request
+
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.itemloaders import ChapterLoader
+from getnovel.app.items import Chapter
+
+TITLE = "//h1/text()"
+CONTENT = "//body/text()"
+TITLE_XPATH = compile_xpath(TITLE)
+CONTENT_XPATH = compile_xpath(CONTENT)
+
+
+def make_page(nodes: int) -> bytes:
+    """Make a chapter page with the given number of text nodes."""
+    line = "&nbsp;&nbsp;&nbsp;&nbsp;这是第{}段的正文，内容很长很长。<br /><br />\n"  # noqa: RUF001
+    body = "".join(line.format(i) for i in range(nodes))
+    return (
+        "<html><head><title>第一章</title></head><body>"
+        f"<h1>第一章 开始</h1>{body}</body></html>"
+    ).encode()
+
+
+def with_loader(res: HtmlResponse) -> Chapter:
+    """Extract a chapter like the spiders did before."""
+    r = ChapterLoader(item=Chapter(), response=res)
+    r.add_value("index", str(res.meta["index"]))
+    r.add_value("url", res.url)
+    r.add_xpath("title", TITLE)
+    r.add_xpath("content", CONTENT)
+    return r.load_item()
+
+
+def fast(res: HtmlResponse) -> Chapter:
+    """Extract a chapter with the precompiled XPath."""
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
+
+
+def run(func: Callable, body: bytes, seconds: float) -> float:
+    """Return the number of items per second."""
+    request = Request("https://example.com/1.html", meta={"index": 1})
+    count = 0
+    stop = time.perf_counter() + seconds
+    while time.perf_counter() < stop:
+        res = HtmlResponse(request.url, body=body, request=request)
+        func(res)
+        count += 1
+    return count / seconds
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=600)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+    body = make_page(args.nodes)
+    request = Request("https://example.com/1.html", meta={"index": 1})
+    res = HtmlResponse(request.url, body=body, request=request)
+    assert dict(with_loader(res)) == dict(fast(res)), "results differ"  # noqa: S101
+    before = run(with_loader, body, args.seconds)
+    after = run(fast, body, args.seconds)
+    print(f"text nodes: {args.nodes}")  # noqa: T201
+    print(f"item loader: {before:8.1f} items/s")  # noqa: T201
+    print(f"fast path:   {after:8.1f} items/s ({after / before:.2f}x)")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
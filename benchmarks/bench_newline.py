@@ -0,0 +1,81 @@
+"""Benchmark fix_bad_newline on large chapters: old quadratic join against now.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_newline.py [--lines 20000] [--rounds 5]
+
+A run-on chapter is made of lower case fragments, so every line is joined to
+a single long paragraph, the worst case of the old version.
+
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from getnovel.utils.file import fix_bad_newline
+
+WORDS = "hắn nói rằng một kiếm chém ra thiên địa biến sắc trong lúc này".split()
+
+
+def old_fix_bad_newline(lines: list[str]) -> list[str]:
+    """Tidy the lines like the version before the rewrite."""
+    lines = lines.copy()
+    s_lines: list[str] = [line.strip() for line in lines if line.strip()]
+    result: list[str] = []
+    result.append(s_lines[0])
+    for line in s_lines[1:]:
+        last = result[-1][-1]
+        first = line[0]
+        if last == "," or last.islower() or first.islower():
+            result[-1] += " " + line
+        elif first in ".,:":
+            result += line
+        else:
+            result.append(line)
+    return result
+
+
+def make_chapter(lines: int, *, run_on: bool) -> list[str]:
+    """Make the lines of a chapter, one paragraph if run on."""
+    rng = random.Random(1)
+    chapter = []
+    for i in range(lines):
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        if not run_on and i % 8 == 0:
+            line = line.capitalize()
+        if not run_on and i % 8 == 7:  # noqa: PLR2004
+            line += "."
+        chapter.extend([line, "  "])
+    return chapter
+
+
+def run(func: Callable, chapter: list[str], rounds: int) -> float:
+    """Return the seconds of a call."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(chapter)
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    for run_on in (False, True):
+        chapter = make_chapter(args.lines, run_on=run_on)
+        assert old_fix_bad_newline(chapter) == fix_bad_newline(chapter)  # noqa: S101
+        before = run(old_fix_bad_newline, chapter, args.rounds)
+        after = run(fix_bad_newline, chapter, args.rounds)
+        kind = "run on" if run_on else "paragraphs"
+        print(  # noqa: T201
+            f"{kind:10} {args.lines} lines: {before * 1000:8.1f} ms ->"
+            f" {after * 1000:8.1f} ms ({before / after:.2f}x)",
+        )
+
+
+if __name__ == "__main__":
+    main()
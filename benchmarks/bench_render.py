@@ -0,0 +1,63 @@
+"""Benchmark the XHTML render stage alone: old per-line formatting against now.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_render.py [--chapters 2000] [--lines 120] [--rounds 3]
+
+The chapters of ``bench_store.py`` are cleaned once, only the rendering of
+the cleaned lines to XHTML is timed.
+
+"""
+
+import argparse
+import html
+import time
+from collections.abc import Callable
+
+from bench_store import make_novel
+
+from getnovel.utils.file import CHAPTER, clean_lines, render_chapter
+from getnovel.utils.template import TEMPLATE
+
+OLD_TEMPLATE = (TEMPLATE / CHAPTER).read_text(encoding="utf-8")
+
+
+def old_render_chapter(lines: list[str]) -> str:
+    """Render a chapter like the version before the template engine."""
+    chapter = [html.escape(line) for line in lines]
+    p_tags = [f"<p>{line}</p>" for line in chapter[1:]]
+    return OLD_TEMPLATE.format(
+        chapter_title=chapter[0],
+        chapter_p_tag_list="\n\n  ".join(p_tags),
+    )
+
+
+def run(func: Callable, chapters: list[list[str]], rounds: int) -> float:
+    """Return the number of chapters rendered per second."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for lines in chapters:
+            func(lines)
+    return len(chapters) * rounds / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=120)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    novel = make_novel(args.chapters, args.lines)
+    chapters = [clean_lines(text, None) for text in novel.values()]
+    for lines in chapters[:10]:
+        assert old_render_chapter(lines) == render_chapter(lines)  # noqa: S101
+    before = run(old_render_chapter, chapters, args.rounds)
+    after = run(render_chapter, chapters, args.rounds)
+    print(  # noqa: T201
+        f"render {before:9.1f} -> {after:9.1f} chapters/s ({after / before:.2f}x)",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark the chapter stores: size on disk and conversion throughput.
+
+Run from the root of the project, once it is installed with ``pip install -e .``::
+
+    python benchmarks/bench_store.py [--chapters 500] [--lines 120]
+
+A novel with repeated names and a site footer is written to one file per
+chapter, to a pack and to a compressed pack, then converted to XHTML.
+
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from getnovel.utils.file import XhtmlFileConverter
+from getnovel.utils.store import PackStore, open_store
+
+NAMES = ["Lâm Phong", "Tiêu Viêm", "Dược Lão", "Nạp Lan Yên Nhiên", "Vân Lam Tông"]
+WORDS = (
+    "hắn nói rằng một kiếm chém ra thiên địa biến sắc trong lúc này đã không thể"
+    " tu luyện đan dược linh khí cảnh giới đột phá sư phụ đệ tử".split()
+)
+FOOTER = "Nguồn: truyenfull.vn - Đọc truyện online, đọc truyện chữ, truyện hay."
+
+
+def make_novel(chapters: int, lines: int) -> dict[int, str]:
+    """Make the text of the chapters."""
+    rng = random.Random(1)
+    words = WORDS + NAMES
+    novel = {}
+    for i in range(1, chapters + 1):
+        body = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(10, 40))) + "."
+            for _ in range(lines)
+        ]
+        novel[i] = "\n".join([f"Chương {i}: {rng.choice(NAMES)}", *body, FOOTER])
+    return novel
+
+
+def write(raw: Path, novel: dict[int, str], kind: str) -> int:
+    """Write the novel, return the size of the chapters on disk."""
+    raw.mkdir(parents=True)
+    if kind == "directory":
+        store = open_store(raw)
+    else:
+        store = PackStore(raw, compress=kind == "compressed")
+    with store:
+        for index, text in novel.items():
+            store.write(index, text)
+    return sum(p.stat().st_size for p in raw.iterdir())
+
+
+def convert(raw: Path) -> float:
+    """Return the number of chapters converted per second."""
+    count = len(open_store(raw).chapters())
+    start = time.perf_counter()
+    XhtmlFileConverter(raw=raw).process(lang_code="vi")
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chapters", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=120)
+    args = parser.parse_args()
+    novel = make_novel(args.chapters, args.lines)
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("directory", "pack", "compressed"):
+            raw = Path(tmp) / kind / "raw"
+            size = write(raw, novel, kind)
+            with open_store(raw) as store:
+                assert all(store.read(i) == t for i, t in novel.items())  # noqa: S101
+            speed = convert(raw)
+            print(  # noqa: T201
+                f"{kind:10} {size / 1024**2:8.2f} MiB {speed:8.1f} chapters/s",
+            )
+
+
+if __name__ == "__main__":
+    main()
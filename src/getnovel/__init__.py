@@ -9,8 +9,11 @@ import sys
 import traceback
 
 from getnovel.utils import arguments
+from getnovel.utils.epub import LEVELS
+from getnovel.utils.file import IDENTITIES
 
 __version__ = "1.5.0"
+LEVEL_CHOICES = [*LEVELS, *map(str, range(10))]  # presets or zlib levels
 
 
 def main(argv: list[str]) -> int:
@@ -50,22 +53,34 @@ def _build_parser() -> argparse.ArgumentParser:
 
     Usage
     -----
-        getnovel crawl [-h] [--start] [--stop] [--result] [--clean] url
+        getnovel crawl [-h] [--start] [--stop] [--result] [--clean] [--jobs]
+                       [--resume] [--offline] [--pack] [--compress] url
 
-        getnovel convert [-h] [--lang] [--dedup] [--result] raw
+        getnovel crawl-batch [-h] [--max-novels] [--max-per-domain] [--clean]
+                             [--jobs] [--resume] [--pack] [--compress] batch
 
-        getnovel dedup [-h] [--result] raw
+        getnovel pack [-h] [--compress] raw
 
-        getnovel epub from_url [-h] [--dedup] [--start] [--stop] url
+        getnovel unpack [-h] raw
 
-        getnovel epub from_raw [-h] [--dedup] [--lang] raw
+        getnovel convert [-h] [--lang] [--dedup] [--identity] [--result] [--jobs]
+                         [--merge] [--merge-kb] raw
+
+        getnovel dedup [-h] [--result] [--identity] [--jobs] raw
+
+        getnovel epub from_url [-h] [--dedup] [--identity] [--start] [--stop]
+                               [--jobs] [--level] [--volume-size] [--volume-mb]
+                               [--merge] [--merge-kb] [--toc-group] url
+
+        getnovel epub from_raw [-h] [--dedup] [--identity] [--lang] [--jobs]
+                               [--level] [--volume-size] [--volume-mb]
+                               [--merge] [--merge-kb] [--toc-group] raw
 
     Returns
     -------
     int
         An ArgumentParser instance for the CLI.
     """
-    # parser
     parser = argparse.ArgumentParser(prog="getnovel", allow_abbrev=False)
     parser.add_argument(
         "-v",
@@ -74,7 +89,18 @@ def _build_parser() -> argparse.ArgumentParser:
         help="show version number and exit",
     )
     subparsers = parser.add_subparsers(title="modes", help="supported modes")
-    # crawl parser
+    _add_crawl_parser(subparsers)
+    _add_crawl_batch_parser(subparsers)
+    _add_pack_parser(subparsers)
+    _add_unpack_parser(subparsers)
+    _add_convert_parser(subparsers)
+    _add_dedup_parser(subparsers)
+    _add_epub_parser(subparsers)
+    return parser
+
+
+def _add_crawl_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the crawl mode."""
     crawl = subparsers.add_parser("crawl", help="get novel content")
     crawl.add_argument(
         "--start",
@@ -94,18 +120,119 @@ def _build_parser() -> argparse.ArgumentParser:
         type=str,
         help="path of the result directory (default: auto generated)",
     )
+    _add_crawl_arguments(crawl)
     crawl.add_argument(
+        "url",
+        type=str,
+        help="url of the novel information page",
+    )
+    crawl.set_defaults(func=arguments.crawl_func)
+
+
+def _add_crawl_batch_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the crawl-batch mode."""
+    crawl_batch = subparsers.add_parser(
+        "crawl-batch",
+        help="get content of many novels in one process",
+    )
+    crawl_batch.add_argument(
+        "--max-novels",
+        type=int,
+        default=8,
+        help="number of novels crawled at the same time (default:  %(default)s)",
+    )
+    crawl_batch.add_argument(
+        "--max-per-domain",
+        type=int,
+        default=2,
+        help="number of novels of the same website crawled at the same time"
+        " (default:  %(default)s)",
+    )
+    _add_crawl_arguments(crawl_batch, offline=False)
+    crawl_batch.add_argument(
+        "batch",
+        type=str,
+        help="path of the batch file, each line is: url[,start[,stop[,result]]]",
+    )
+    crawl_batch.set_defaults(func=arguments.crawl_batch_func)
+
+
+def _add_crawl_arguments(
+    parser: argparse.ArgumentParser,
+    *,
+    offline: bool = True,
+) -> None:
+    """Add the options shared by the crawl modes."""
+    parser.add_argument(
         "--clean",
         action="store_true",
         help="if specified, clean result files after crawling (default:  %(default)s)",
     )
-    crawl.add_argument(
-        "url",
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes that clean the chapters (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="if specified, skip the chapters that are already downloaded,"
+        " so an interrupted crawl can be resumed (default:  %(default)s)",
+    )
+    if offline:
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="if specified, read all pages from the http cache, without"
+            " network access (default:  %(default)s)",
+        )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="if specified, store all chapters in a single pack file"
+        " (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="if specified, store all chapters in a pack file compressed with zstd"
+        " (default:  %(default)s)",
+    )
+
+
+def _add_pack_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the pack mode."""
+    pack = subparsers.add_parser("pack", help="move chapter files to a pack file")
+    pack.add_argument(
+        "--compress",
+        action="store_true",
+        help="if specified, compress the chapters with zstd (default:  %(default)s)",
+    )
+    pack.add_argument(
+        "raw",
         type=str,
-        help="url of the novel information page",
+        help="path of raw directory",
     )
-    crawl.set_defaults(func=arguments.crawl_func)
-    # convert parser
+    pack.set_defaults(func=arguments.pack_func)
+
+
+def _add_unpack_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the unpack mode."""
+    unpack = subparsers.add_parser(
+        "unpack",
+        help="move chapters of a pack file to chapter files",
+    )
+    unpack.add_argument(
+        "raw",
+        type=str,
+        help="path of raw directory",
+    )
+    unpack.set_defaults(func=arguments.unpack_func)
+
+
+def _add_convert_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the convert mode."""
     convert = subparsers.add_parser("convert", help="convert chapters to xhtml")
     convert.add_argument(
         "--lang",
@@ -117,31 +244,52 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="if specified, deduplicate chapter title (default:  %(default)s)",
     )
+    _add_identity_argument(convert)
     convert.add_argument(
         "--result",
         type=str,
         help="path of result directory (default: auto generated)",
     )
+    convert.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes that convert the chapters (default:  %(default)s)",
+    )
+    _add_merge_arguments(convert)
     convert.add_argument(
         "raw",
         type=str,
         help="path of raw directory",
     )
     convert.set_defaults(func=arguments.convert_func)
-    # deduplicate
+
+
+def _add_dedup_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the dedup mode."""
     dedup = subparsers.add_parser("dedup", help="deduplicate chapter title")
     dedup.add_argument(
         "--result",
         type=str,
         help="path of result directory (default: current working directory)",
     )
+    _add_identity_argument(dedup)
+    dedup.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes that clean the chapters (default:  %(default)s)",
+    )
     dedup.add_argument(
         "raw",
         type=str,
         help="path of raw directory",
     )
     dedup.set_defaults(func=arguments.dedup_func)
-    # epub parser
+
+
+def _add_epub_parser(subparsers: argparse._SubParsersAction) -> None:
+    """Add the parser of the epub mode and its from_raw and from_url modes."""
     epub = subparsers.add_parser("epub", help="make epub")
     subparsers_epub = epub.add_subparsers(title="modes", help="supported modes")
     # epub from_raw parser
@@ -159,11 +307,13 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="if specified, deduplicate chapter title (default:  %(default)s)",
     )
+    _add_identity_argument(from_raw)
     from_raw.add_argument(
         "--lang",
         default="vi",
         help="language code of the novel (default:  %(default)s)",
     )
+    _add_epub_arguments(from_raw)
     from_raw.add_argument(
         "raw",
         type=str,
@@ -182,6 +332,7 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="if specified, deduplicate chapter title (default:  %(default)s)",
     )
+    _add_identity_argument(from_url)
     from_url.add_argument(
         "--start",
         type=int,
@@ -195,13 +346,82 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Stop crawling after this chapter,"
         " input -1 to get all chapters (default:  %(default)s)",
     )
+    _add_epub_arguments(from_url)
     from_url.set_defaults(func=arguments.epub_from_url_func)
     from_url.add_argument(
         "url",
         type=str,
         help="url of the novel information page",
     )
-    return parser
+
+
+def _add_epub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options shared by the epub modes."""
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes that convert the chapters (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--level",
+        default="max",
+        choices=LEVEL_CHOICES,
+        metavar="{fast,max,0-9}",
+        help="compression level of the epub, fast for previews (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--volume-size",
+        type=int,
+        default=0,
+        help="split the novel in epubs of this number of chapters,"
+        " 0 to make one epub (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--volume-mb",
+        type=float,
+        default=0,
+        help="split the novel in epubs of this size of text in MB,"
+        " 0 to make one epub (default:  %(default)s)",
+    )
+    _add_merge_arguments(parser)
+    parser.add_argument(
+        "--toc-group",
+        type=int,
+        default=0,
+        help="group the chapters of the table of contents by this number,"
+        " 0 for a flat table of contents (default:  %(default)s)",
+    )
+
+
+def _add_identity_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the option that sets the words of a chapter title."""
+    parser.add_argument(
+        "--identity",
+        action="append",
+        dest="identities",
+        metavar="WORD",
+        help="word of a chapter title for the deduplication, repeat the option"
+        f" for more words (default: {', '.join(IDENTITIES)})",
+    )
+
+
+def _add_merge_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options that merge chapters in xhtml documents."""
+    parser.add_argument(
+        "--merge",
+        type=int,
+        default=0,
+        help="merge up to this number of chapters in an xhtml document,"
+        " 0 for one document per chapter (default:  %(default)s)",
+    )
+    parser.add_argument(
+        "--merge-kb",
+        type=float,
+        default=0,
+        help="merge chapters up to this size of text in KB in an xhtml document,"
+        " 0 for one document per chapter (default:  %(default)s)",
+    )
 
 
 class GetnovelException(BaseException):
@@ -0,0 +1,199 @@
+"""Share the request budget of a website between the novels that crawl it.
+
+Every spider has a policy in the ``DOMAIN_POLICIES`` setting, keyed by the
+spider name, the ``default`` policy fills the missing keys:
+
+- ``delay``: seconds between two requests on average.
+- ``concurrency``: max number of requests in flight.
+- ``burst``: number of requests that can be sent at once after an idle time.
+- ``max_concurrency``: ceiling of the concurrency for
+  :class:`getnovel.app.throttle.AimdThrottle`.
+
+All crawlers of a spider in the process share one :class:`DomainBudget`
+(see :class:`getnovel.utils.crawler.BatchCrawler`). Waiting requests are
+served round-robin across the crawlers, so a novel with thousands of chapters
+can not starve the others.
+
+"""
+
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Hashable
+from typing import TYPE_CHECKING
+
+from twisted.internet.defer import Deferred
+
+if TYPE_CHECKING:
+    from twisted.internet.base import DelayedCall
+
+_logger = logging.getLogger(__name__)
+
+BUDGETS: dict[str, "DomainBudget"] = {}  # budget of each spider name
+
+
+class DomainBudget:
+    """Token bucket with a limit of requests in flight.
+
+    Attributes
+    ----------
+    delay : float
+        Seconds to earn a token.
+    concurrency : int
+        Max number of requests in flight.
+    burst : int
+        Max number of tokens.
+    max_concurrency : int
+        Ceiling of the concurrency when it is adapted to the website.
+    tokens : float
+        Number of requests that can be sent now, if a slot is free.
+    inflight : Counter[Hashable]
+        Number of requests in flight of each crawler.
+    """
+
+    def __init__(
+        self: "DomainBudget",
+        delay: float = 0,
+        concurrency: int = 8,
+        burst: int = 1,
+        max_concurrency: int | None = None,
+    ) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        delay : float, optional
+            Seconds between two requests on average, by default 0.
+        concurrency : int, optional
+            Max number of requests in flight, by default 8.
+        burst : int, optional
+            Number of requests that can be sent at once, by default 1.
+        max_concurrency : int | None, optional
+            Ceiling of the concurrency, by default the concurrency.
+        """
+        self.delay = max(0.0, float(delay))
+        self.concurrency = max(1, int(concurrency))
+        self.burst = max(1, int(burst))
+        self.max_concurrency = max(self.concurrency, int(max_concurrency or 0))
+        self.tokens = float(self.burst)
+        self.inflight: Counter[Hashable] = Counter()
+        self.__stamp = time.monotonic()  # last refill of the bucket
+        self.__paused = 0.0  # no request is sent before this time
+        self.__waiters: OrderedDict[Hashable, deque[Deferred]] = OrderedDict()
+        self.__timer: DelayedCall | None = None
+
+    def acquire(self: "DomainBudget", key: Hashable) -> Deferred:
+        """Wait for the permission to send a request.
+
+        Parameters
+        ----------
+        key : Hashable
+            The crawler that sends the request.
+
+        Returns
+        -------
+        Deferred
+            Fired when the request can be sent, :meth:`release` must be called
+            after the request is done.
+        """
+        d = Deferred()
+        self.__waiters.setdefault(key, deque()).append(d)
+        self.__dispatch()
+        return d
+
+    def release(self: "DomainBudget", key: Hashable) -> None:
+        """Free the slot of a request that is done.
+
+        Parameters
+        ----------
+        key : Hashable
+            The crawler that sent the request.
+        """
+        if self.inflight[key] > 0:
+            self.inflight[key] -= 1
+        self.__dispatch()
+
+    def pause(self: "DomainBudget", seconds: float) -> None:
+        """Stop sending requests for a while.
+
+        Parameters
+        ----------
+        seconds : float
+            Seconds to wait before the next request.
+        """
+        self.__paused = max(self.__paused, time.monotonic() + seconds)
+
+    def leave(self: "DomainBudget", key: Hashable) -> None:
+        """Remove a closed crawler, its waiting requests are cancelled.
+
+        Parameters
+        ----------
+        key : Hashable
+            The closed crawler.
+        """
+        for d in self.__waiters.pop(key, ()):
+            d.cancel()
+        del self.inflight[key]
+        self.__dispatch()
+
+    def __refill(self: "DomainBudget") -> None:
+        """Earn the tokens of the time elapsed since the last refill."""
+        now = time.monotonic()
+        if self.delay:
+            self.tokens += (now - self.__stamp) / self.delay
+        else:
+            self.tokens = self.burst
+        self.tokens = min(self.tokens, self.burst)
+        self.__stamp = now
+
+    def __dispatch(self: "DomainBudget") -> None:
+        """Let the waiting requests go while there are tokens and free slots."""
+        self.__refill()
+        wait = self.__paused - time.monotonic()
+        if self.__waiters and wait > 0:
+            self.__wake(wait)
+            return
+        while self.__waiters and self.inflight.total() < self.concurrency:
+            if self.tokens < 1:
+                self.__wake((1 - self.tokens) * self.delay)
+                return
+            key, waiters = next(iter(self.__waiters.items()))
+            d = waiters.popleft()
+            if waiters:
+                self.__waiters.move_to_end(key)  # round-robin across crawlers
+            else:
+                del self.__waiters[key]
+            self.tokens -= 1
+            self.inflight[key] += 1
+            d.callback(key)
+
+    def __wake(self: "DomainBudget", delay: float) -> None:
+        """Dispatch again when the next token is earned."""
+        if self.__timer is not None and self.__timer.active():
+            return
+        # imported late, scrapy installs the reactor first
+        from twisted.internet import reactor  # noqa: PLC0415
+
+        self.__timer = reactor.callLater(delay, self.__dispatch)
+
+
+def get_budget(name: str, policies: dict[str, dict]) -> DomainBudget:
+    """Get the budget shared by all crawlers of a spider.
+
+    Parameters
+    ----------
+    name : str
+        Name of the spider.
+    policies : dict[str, dict]
+        Value of the ``DOMAIN_POLICIES`` setting.
+
+    Returns
+    -------
+    DomainBudget
+        The budget of the spider, it is created by the first crawler.
+    """
+    if name not in BUDGETS:
+        policy = {**policies.get("default", {}), **policies.get(name, {})}
+        BUDGETS[name] = DomainBudget(**policy)
+        _logger.info("Budget of %s: %s", name, policy)
+    return BUDGETS[name]
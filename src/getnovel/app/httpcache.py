@@ -0,0 +1,557 @@
+"""Store the HTTP cache in a few compressed pack files, decide what is fresh.
+
+Scrapy's filesystem storage writes one directory of uncompressed files per
+request and never deletes them. :class:`PackCacheStorage` appends compressed
+responses to pack files of ``HTTPCACHE_PACK_BYTES`` and keeps their position
+in a sqlite index. When the cache is bigger than ``HTTPCACHE_MAX_BYTES`` the
+least recently used responses are evicted and the packs that are mostly
+evicted are rewritten.
+
+Usage::
+
+    HTTPCACHE_STORAGE = "getnovel.app.httpcache.PackCacheStorage"
+
+Responses are compressed with zstd when ``compression.zstd`` (Python 3.14)
+or ``backports.zstd`` is installed, with gzip otherwise. All crawlers of the
+process share one store. Several processes can share the cache directory: a
+process locks the pack it appends to, another process starts its own pack,
+and compaction skips the locked packs. Locks need ``fcntl`` (POSIX). A blob
+that can not be read or decoded is a cache miss.
+
+:class:`NovelCachePolicy` knows the pages of a novel: a chapter never changes,
+it is cached forever. The info page and the table of content get new chapters,
+they are fresh for ``HTTPCACHE_INDEX_TTL`` seconds and revalidated with
+``If-None-Match`` and ``If-Modified-Since`` after that. The last chapter gets
+a next link when a new chapter is published, spiders send a cached chapter
+without next link again with :func:`refresh`, it is revalidated like the
+index pages::
+
+    HTTPCACHE_POLICY = "getnovel.app.httpcache.NovelCachePolicy"
+
+"""
+
+import gzip
+import logging
+import pickle
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from pathlib import Path
+from typing import BinaryIO
+
+from scrapy import Spider
+from scrapy.http import Headers, Request, Response
+from scrapy.responsetypes import responsetypes
+from scrapy.settings import BaseSettings
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+try:
+    import fcntl
+except ImportError:  # Windows, packs are not locked
+    fcntl = None
+
+_logger = logging.getLogger(__name__)
+
+GZIP = b"g"
+ZSTD = b"z"
+CHAPTER_CALLBACKS = {"parse_content"}  # callbacks of the chapter pages
+REFRESH = "refresh_cache"  # meta key of a chapter page that is revalidated
+STORES: dict[Path, "PackStore"] = {}  # open store of each cache directory
+
+
+def compress(data: bytes, codec: bytes) -> bytes:
+    """Compress data, the codec is stored in the first byte."""
+    if codec == ZSTD:
+        return ZSTD + zstd.compress(data)
+    return GZIP + gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def decompress(blob: bytes) -> bytes:
+    """Decompress data made by :func:`compress`."""
+    codec, data = blob[:1], blob[1:]
+    if codec == ZSTD:
+        return zstd.decompress(data)
+    return gzip.decompress(data)
+
+
+class PackStore:
+    """Key-value store of compressed blobs in pack files.
+
+    Attributes
+    ----------
+    root : Path
+        Directory of the packs and the index.
+    max_bytes : int
+        Size of the store that triggers the eviction, 0 for no limit.
+    pack_bytes : int
+        Size of a pack, a new pack is started after it.
+    size : int
+        Size of the live blobs.
+    users : int
+        Number of storages that use the store.
+    """
+
+    def __init__(
+        self: "PackStore",
+        root: Path,
+        max_bytes: int,
+        pack_bytes: int,
+    ) -> None:
+        """Open the store, create it if needed.
+
+        Parameters
+        ----------
+        root : Path
+            Directory of the packs and the index.
+        max_bytes : int
+            Size of the store that triggers the eviction, 0 for no limit.
+        pack_bytes : int
+            Size of a pack, a new pack is started after it.
+        """
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.pack_bytes = pack_bytes
+        self.users = 0
+        self.db = sqlite3.connect(root / "index.sqlite", timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, pack INTEGER NOT NULL, offset INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, stored REAL NOT NULL, used REAL NOT NULL)",
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries(used)")
+        self.size: int = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries",
+        ).fetchone()[0]
+        self.pack = max(self.packs(), default=1)  # number of the pack being written
+        self.__writer = self.path(self.pack).open("ab")
+        if not lock(self.__writer):  # another process appends to it
+            self.__roll()
+        self.__readers: dict[int, BinaryIO] = {}
+
+    def path(self: "PackStore", pack: int) -> Path:
+        """Get the path of a pack."""
+        return self.root / f"{pack:06d}.pack"
+
+    def packs(self: "PackStore") -> list[int]:
+        """Get the number of the packs."""
+        return [int(p.stem) for p in self.root.glob("*.pack") if p.stem.isdigit()]
+
+    def get(self: "PackStore", key: str) -> tuple[bytes, float] | None:
+        """Read a blob and mark it as used.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob.
+
+        Returns
+        -------
+        tuple[bytes, float] | None
+            The blob and the time it was stored, None if it is not found.
+        """
+        row = self.db.execute(
+            "SELECT pack, offset, size, stored FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        pack, offset, size, stored = row
+        try:
+            blob = self.__read(pack, offset, size)
+        except FileNotFoundError:  # compacted by another process
+            return None
+        if len(blob) != size:
+            _logger.warning("Truncated entry in pack %s, drop it", pack)
+            self.drop(key, pack, offset)
+            return None
+        self.db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+        return blob, stored
+
+    def put(self: "PackStore", key: str, blob: bytes, stored: float = 0) -> None:
+        """Append a blob to the current pack.
+
+        Parameters
+        ----------
+        key : str
+            Key of the blob, an older blob with the same key is replaced.
+        blob : bytes
+            The blob to store.
+        stored : float, optional
+            Time the blob was stored, by default now.
+        """
+        if self.__writer.tell() >= self.pack_bytes:
+            self.__roll()
+        self.delete(key)
+        offset = self.__writer.tell()
+        self.__writer.write(blob)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            (key, self.pack, offset, len(blob), stored or now, now),
+        )
+        self.size += len(blob)
+        self.__writer.flush()  # the index never points to unwritten bytes
+        self.db.commit()
+        if self.max_bytes and self.size > self.max_bytes:
+            self.evict()
+
+    def delete(self: "PackStore", key: str) -> None:
+        """Remove a blob from the index, its bytes are freed by compaction."""
+        row = self.db.execute(
+            "SELECT size FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is not None:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.size -= row[0]
+
+    def drop(self: "PackStore", key: str, pack: int, offset: int) -> None:
+        """Remove a blob from the index if it was not moved or replaced since."""
+        cursor = self.db.execute(
+            "DELETE FROM entries WHERE key = ? AND pack = ? AND offset = ?",
+            (key, pack, offset),
+        )
+        if cursor.rowcount:
+            self.db.commit()
+
+    def evict(self: "PackStore") -> None:
+        """Remove the least recently used blobs until 90% of the budget."""
+        self.size = self.db.execute(  # other processes write to the store too
+            "SELECT COALESCE(SUM(size), 0) FROM entries",
+        ).fetchone()[0]
+        target = self.max_bytes * 9 // 10
+        evicted = 0
+        rows = self.db.execute("SELECT key, size FROM entries ORDER BY used").fetchall()
+        keys = []
+        for key, size in rows:
+            if self.size <= target:
+                break
+            keys.append((key,))
+            self.size -= size
+            evicted += size
+        self.db.executemany("DELETE FROM entries WHERE key = ?", keys)
+        _logger.info("Evict %s responses (%s bytes) from the cache", len(keys), evicted)
+        self.compact()
+
+    def compact(self: "PackStore") -> None:
+        """Delete the packs without live blobs, rewrite the half empty packs.
+
+        The packs locked by another process are skipped.
+        """
+        live = dict(
+            self.db.execute("SELECT pack, SUM(size) FROM entries GROUP BY pack"),
+        )
+        for pack in sorted(self.packs()):
+            p = self.path(pack)
+            try:
+                if pack == self.pack or live.get(pack, 0) * 2 >= p.stat().st_size:
+                    continue
+                f = p.open("rb")
+            except FileNotFoundError:  # compacted by another process
+                continue
+            with f:
+                if lock(f):
+                    self.__move(pack)
+                    _logger.info("Compact pack %s of the cache", pack)
+                    p.unlink(missing_ok=True)  # before the lock is released
+
+    def __move(self: "PackStore", pack: int) -> None:
+        """Move the live blobs of a pack to the current pack."""
+        rows = self.db.execute(
+            "SELECT key, offset, size, stored, used FROM entries WHERE pack = ?",
+            (pack,),
+        ).fetchall()
+        for key, offset, size, stored, used in rows:
+            blob = self.__read(pack, offset, size)
+            self.put(key, blob, stored)
+            self.db.execute(
+                "UPDATE entries SET used = ? WHERE key = ?",
+                (used, key),
+            )
+        reader = self.__readers.pop(pack, None)
+        if reader is not None:
+            reader.close()
+        self.db.commit()  # the pack is deleted after its blobs are moved
+
+    def close(self: "PackStore") -> None:
+        """Write the index and close the files."""
+        self.__writer.close()
+        for reader in self.__readers.values():
+            reader.close()
+        self.__readers.clear()
+        self.db.commit()
+        self.db.close()
+
+    def __read(self: "PackStore", pack: int, offset: int, size: int) -> bytes:
+        """Read the bytes of a blob."""
+        if pack == self.pack:
+            self.__writer.flush()
+        if pack not in self.__readers:
+            self.__readers[pack] = self.path(pack).open("rb")
+        reader = self.__readers[pack]
+        reader.seek(offset)
+        return reader.read(size)
+
+    def __roll(self: "PackStore") -> None:
+        """Start a new pack, that no other process writes to."""
+        self.__writer.close()
+        self.db.commit()
+        while True:
+            self.pack = max([self.pack, *self.packs()]) + 1
+            try:
+                self.__writer = self.path(self.pack).open("xb")
+            except FileExistsError:  # made by another process meanwhile
+                continue
+            if lock(self.__writer):
+                return
+            self.__writer.close()
+
+
+def lock(f: BinaryIO) -> bool:
+    """Lock a file until it is closed, False if another process holds it."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def open_store(settings: BaseSettings) -> PackStore:
+    """Open the store of the cache directory, or share the open one.
+
+    Parameters
+    ----------
+    settings : BaseSettings
+        Settings of the crawler.
+
+    Returns
+    -------
+    PackStore
+        The store, :func:`close_store` must be called after use.
+    """
+    root = Path(data_path(settings["HTTPCACHE_DIR"], createdir=True)).resolve()
+    if root not in STORES:
+        STORES[root] = PackStore(
+            root=root,
+            max_bytes=settings.getint("HTTPCACHE_MAX_BYTES"),
+            pack_bytes=settings.getint("HTTPCACHE_PACK_BYTES", 64 * 1024**2),
+        )
+    STORES[root].users += 1
+    return STORES[root]
+
+
+def close_store(store: PackStore) -> None:
+    """Close the store after its last user."""
+    store.users -= 1
+    if store.users <= 0:
+        STORES.pop(store.root, None)
+        store.close()
+
+
+class PackCacheStorage:
+    """HTTP cache storage in compressed pack files, with a size limit."""
+
+    def __init__(self: "PackCacheStorage", settings: BaseSettings) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        settings : BaseSettings
+            Settings of the crawler.
+        """
+        self.settings = settings
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        codec = settings.get("HTTPCACHE_COMPRESSION", "zstd")
+        if codec == "zstd" and zstd is None:
+            codec = "gzip"
+        self.codec = ZSTD if codec == "zstd" else GZIP
+        self.store: PackStore = None
+
+    def open_spider(self: "PackCacheStorage", spider: Spider) -> None:
+        """Open the store."""
+        self.store = open_store(self.settings)
+        self.fingerprinter = spider.crawler.request_fingerprinter
+        _logger.debug("Using pack cache storage in %s", self.store.root)
+
+    def close_spider(self: "PackCacheStorage", spider: Spider) -> None:
+        """Close the store."""
+        _ = spider
+        close_store(self.store)
+
+    def retrieve_response(
+        self: "PackCacheStorage",
+        spider: Spider,
+        request: Request,
+    ) -> Response | None:
+        """Return the response if it is in the cache, or None otherwise."""
+        entry = self.store.get(self.key(spider, request))
+        if entry is None:
+            return None
+        blob, stored = entry
+        if 0 < self.expiration_secs < time.time() - stored:
+            return None  # expired
+        try:
+            data = pickle.loads(decompress(blob))  # noqa: S301
+        except Exception:  # a broken blob is a miss, the page is downloaded again
+            _logger.warning(
+                "Can not decode %s from the cache",
+                request.url,
+                exc_info=True,
+            )
+            return None
+        headers = Headers(data["headers"])
+        respcls = responsetypes.from_args(
+            headers=headers,
+            url=data["url"],
+            body=data["body"],
+        )
+        request.meta["cache_timestamp"] = stored
+        return respcls(
+            url=data["url"],
+            headers=headers,
+            status=data["status"],
+            body=data["body"],
+        )
+
+    def store_response(
+        self: "PackCacheStorage",
+        spider: Spider,
+        request: Request,
+        response: Response,
+    ) -> None:
+        """Store the response in the cache."""
+        data = {
+            "url": response.url,
+            "request_url": request.url,
+            "status": response.status,
+            "headers": dict(response.headers),
+            "body": response.body,
+        }
+        blob = compress(pickle.dumps(data, protocol=4), self.codec)
+        self.store.put(self.key(spider, request), blob)
+
+    def key(self: "PackCacheStorage", spider: Spider, request: Request) -> str:
+        """Get the key of a request in the store."""
+        return f"{spider.name}/{self.fingerprinter.fingerprint(request).hex()}"
+
+
+class NovelCachePolicy:
+    """Cache chapters forever, revalidate the info and table of content pages."""
+
+    def __init__(self: "NovelCachePolicy", settings: BaseSettings) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        settings : BaseSettings
+            Settings of the crawler.
+        """
+        self.ignore_schemes = settings.getlist("HTTPCACHE_IGNORE_SCHEMES")
+        self.ignore_http_codes = {
+            int(c) for c in settings.getlist("HTTPCACHE_IGNORE_HTTP_CODES")
+        }
+        self.index_ttl = settings.getint("HTTPCACHE_INDEX_TTL", 3600)
+
+    def should_cache_request(self: "NovelCachePolicy", request: Request) -> bool:
+        """Cache all requests except the ignored schemes."""
+        return urlparse_cached(request).scheme not in self.ignore_schemes
+
+    def should_cache_response(
+        self: "NovelCachePolicy",
+        response: Response,
+        request: Request,
+    ) -> bool:
+        """Cache successful responses, whatever their Cache-Control says.
+
+        A missing chapter may be published later, so only 2xx and 3xx
+        responses are cached.
+        """
+        _ = request
+        return (
+            response.status < HTTPStatus.BAD_REQUEST
+            and response.status not in self.ignore_http_codes
+        )
+
+    def is_cached_response_fresh(
+        self: "NovelCachePolicy",
+        cachedresponse: Response,
+        request: Request,
+    ) -> bool:
+        """Check if a cached response can be used without asking the website.
+
+        Stale pages are revalidated, the validators of the cached response
+        are added to the request.
+        """
+        if is_chapter(request) and not request.meta.get(REFRESH):
+            return True
+        stored = request.meta.get("cache_timestamp") or rfc1123_to_epoch(
+            cachedresponse.headers.get("Date"),
+        )
+        if stored and time.time() - stored < self.index_ttl:
+            return True
+        etag = cachedresponse.headers.get("ETag")
+        if etag:
+            request.headers["If-None-Match"] = etag
+        modified = cachedresponse.headers.get("Last-Modified")
+        if modified:
+            request.headers["If-Modified-Since"] = modified
+        return False
+
+    def is_cached_response_valid(
+        self: "NovelCachePolicy",
+        cachedresponse: Response,
+        response: Response,
+        request: Request,
+    ) -> bool:
+        """Use the cached response if the website says it is not modified."""
+        _ = (cachedresponse, request)
+        return response.status == HTTPStatus.NOT_MODIFIED
+
+
+def is_chapter(request: Request) -> bool:
+    """Check if a request is sent to a chapter page, by its callback."""
+    return getattr(request.callback, "__name__", None) in CHAPTER_CALLBACKS
+
+
+def refresh(res: Response) -> Request | None:
+    """Request a cached chapter page again, it may have changed since.
+
+    Parameters
+    ----------
+    res : Response
+        A chapter page without a link to the next chapter.
+
+    Returns
+    -------
+    Request | None
+        Request that revalidates the page, None if the page is not from the
+        cache or is already revalidated.
+    """
+    if "cached" not in res.flags or res.meta.get(REFRESH):
+        return None
+    return res.request.replace(meta={**res.meta, REFRESH: True}, dont_filter=True)
+
+
+def rfc1123_to_epoch(date: bytes | None) -> float | None:
+    """Convert the value of a Date header to a timestamp."""
+    if not date:
+        return None
+    try:
+        return parsedate_to_datetime(date.decode("latin-1")).timestamp()
+    except (TypeError, ValueError):
+        return None
@@ -11,7 +11,7 @@ from scrapy.loader import ItemLoader
 
 def filter_blank(v: str | None) -> str | None:
     """Remove blank lines."""
-    return v
+    return v or None
 
 
 class InfoLoader(ItemLoader):
@@ -30,7 +30,7 @@ class InfoLoader(ItemLoader):
     }
     """
 
-    default_input_processor = MapCompose(str.strip, filter_blank)
+    default_input_processor = MapCompose(str.strip)  # blank lines are kept
     default_output_processor = Join()
     types_out = Join(", ")
     foreword_out = Join("\n")
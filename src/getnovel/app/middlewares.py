@@ -5,6 +5,13 @@
 """
 
 from scrapy import signals
+from scrapy.downloadermiddlewares.retry import get_retry_request
+from scrapy.exceptions import IgnoreRequest
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import error
+
+from getnovel.app.budget import DomainBudget, get_budget
+from getnovel.app.throttle import AimdThrottle, get_throttle, is_blocked, retry_after
 
 
 class AppSpiderMiddleware:
@@ -75,16 +82,32 @@ class AppDownloaderMiddleware:
     Not all methods need to be defined. If a method is not defined,
     scrapy acts as if the downloader middleware does not modify the
     passed objects.
+
+    Requests wait for the budget of their website, see
+    :mod:`getnovel.app.budget`, and the budget is adapted to the errors of
+    the website, see :mod:`getnovel.app.throttle`. The middleware must be
+    placed after HttpCacheMiddleware, so cached responses do not spend the
+    budget.
     """
 
+    def __init__(self, stats):
+        """Initialize attributes."""
+        self.stats = stats
+        self.budget: DomainBudget = None
+        self.throttle: AimdThrottle | None = None
+        self.codes: set[int] = set()  # statuses that decrease the budget
+        self.markers: list[str] = []  # texts of anti-bot pages
+        self.offline = False  # pages are only read from the cache
+
     @classmethod
     def from_crawler(cls, crawler):
         """This method is used by Scrapy to create your spiders."""
-        s = cls()
+        s = cls(crawler.stats)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
-    def process_request(self, request, spider):
+    async def process_request(self, request, spider):
         """Process request.
 
         Called for each request that goes through the downloader
@@ -96,8 +119,17 @@ class AppDownloaderMiddleware:
         - or return a Request object
         - or raise IgnoreRequest: process_exception() methods of
           installed downloader middleware will be called
+
+        Predicted chapters beyond the end of the novel are ignored.
         """
-        _ = (self, request, spider)
+        prefetcher = getattr(spider, "prefetcher", None)
+        if (prefetcher is not None) and not prefetcher.wanted(request):
+            msg = f"Chapter {request.meta['index']} is beyond the end of the novel"
+            raise IgnoreRequest(msg)
+        await maybe_deferred_to_future(self.budget.acquire(self))
+        request.meta["budget"] = True
+        if self.throttle is not None:
+            self.throttle.stamp(request)
 
     def process_response(self, request, response, spider):
         """Called with the response returned from the downloader.
@@ -106,9 +138,31 @@ class AppDownloaderMiddleware:
         - return a Response object
         - return a Request object
         - or raise IgnoreRequest
+
+        Block pages are retried like a failed request.
         """
-        _ = (self, request, spider)
-        return response
+        if not request.meta.get("budget") or self.throttle is None:
+            self.release(request)
+            return response
+        blocked = is_blocked(response, self.markers)
+        if blocked or response.status in self.codes:
+            reason = "blocked" if blocked else str(response.status)
+            self.decrease(request, reason, spider)
+            wait = retry_after(response)
+            if wait is not None and wait > 0:
+                self.budget.pause(wait)
+                self.stats.inc_value(f"throttle/{spider.name}/retry_after")
+        else:
+            self.throttle.increase()
+        self.record(spider)
+        self.release(request)
+        if not blocked:
+            return response
+        retry = get_retry_request(request, spider=spider, reason="blocked")
+        if retry is None:
+            msg = f"Blocked by the website: {request.url}"
+            raise IgnoreRequest(msg)
+        return retry
 
     def process_exception(self, request, exception, spider):
         """Process exception.
@@ -121,8 +175,51 @@ class AppDownloaderMiddleware:
         - return a Response object: stops process_exception() chain
         - return a Request object: stops process_exception() chain
         """
+        if self.offline and isinstance(exception, IgnoreRequest):
+            spider.logger.error("Not in the cache: %s", request.url)
+        if (
+            request.meta.get("budget")
+            and self.throttle is not None
+            and isinstance(exception, error.TimeoutError | error.TCPTimedOutError)
+        ):
+            self.decrease(request, "timeout", spider)
+            self.record(spider)
+        self.release(request)
+
+    def decrease(self, request, reason, spider):
+        """Decrease the budget of the website and count it."""
+        if self.throttle.decrease(request, reason):
+            self.stats.inc_value(f"throttle/{spider.name}/decrease")
+        self.stats.inc_value(f"throttle/{spider.name}/error/{reason}")
+
+    def record(self, spider):
+        """Export the state of the budget to the stats."""
+        name = spider.name
+        self.stats.set_value(f"throttle/{name}/concurrency", self.budget.concurrency)
+        self.stats.set_value(f"throttle/{name}/delay", round(self.budget.delay, 3))
+
+    def release(self, request):
+        """Give back the budget of a request, only once."""
+        if request.meta.pop("budget", False):
+            self.budget.release(self)
 
     def spider_opened(self, spider):
-        """Log spider information."""
-        _ = self
+        """Log spider information and join the budget of the website."""
         spider.logger.info("Spider opened: %s", spider.name)
+        settings = spider.settings
+        policies = settings.getdict("DOMAIN_POLICIES")
+        self.budget = get_budget(spider.name, policies)
+        self.offline = settings.getbool("HTTPCACHE_IGNORE_MISSING")
+        if settings.getbool("THROTTLE_ENABLED"):
+            self.throttle = get_throttle(
+                spider.name,
+                self.budget,
+                settings.getfloat("THROTTLE_MAX_DELAY", 60),
+            )
+            self.codes = {int(c) for c in settings.getlist("THROTTLE_HTTP_CODES")}
+            self.markers = settings.getlist("THROTTLE_BLOCK_MARKERS")
+
+    def spider_closed(self, spider):
+        """Leave the budget of the website."""
+        _ = spider
+        self.budget.leave(self)
@@ -13,18 +13,65 @@ from shutil import copy
 
 from itemadapter import ItemAdapter
 from scrapy import Item, Spider
+from scrapy.crawler import Crawler
 from scrapy.exceptions import DropItem
 from scrapy.pipelines.images import ImagesPipeline
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import Deferred
 
 from getnovel.app.items import Chapter, Info
+from getnovel.app.writer import FileWriter
+from getnovel.utils.store import open_store
 
 _logger = logging.getLogger(__name__)
 
 
 class AppPipeline:
-    """Define App pipeline."""
+    """Define App pipeline.
 
-    def process_item(self: "AppPipeline", item: Item, spider: Spider) -> Item:
+    Files are written by a :class:`~getnovel.app.writer.FileWriter` thread.
+    Chapters go to the store of the result directory, one file per chapter
+    or a pack, see the ``CHAPTER_STORE`` and ``CHAPTER_COMPRESS`` settings.
+    """
+
+    def __init__(self: "AppPipeline", writer: FileWriter) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        writer : FileWriter
+            The writer of the files.
+        """
+        self.writer = writer
+
+    @classmethod
+    def from_crawler(cls: type["AppPipeline"], crawler: Crawler) -> "AppPipeline":
+        """Create the pipeline with the writer settings of the crawler."""
+        settings = crawler.settings
+        writer = FileWriter(
+            max_pending=settings.getint("WRITER_MAX_PENDING", 256),
+            batch_size=settings.getint("WRITER_BATCH_SIZE", 32),
+            stats=crawler.stats,
+        )
+        return cls(writer)
+
+    def open_spider(self: "AppPipeline", spider: Spider) -> None:
+        """Start the writer."""
+        settings = spider.settings
+        store = open_store(
+            Path(settings["RESULT"]),
+            default=settings.get("CHAPTER_STORE", "directory"),
+            compress=settings.getbool("CHAPTER_COMPRESS"),
+            samples=settings.getint("CHAPTER_DICT_SAMPLES", 32),
+        )
+        self.writer.start(store)
+
+    def close_spider(self: "AppPipeline", spider: Spider) -> Deferred:
+        """Write the queued files before the spider is closed."""
+        _ = spider
+        return self.writer.close()
+
+    async def process_item(self: "AppPipeline", item: Item, spider: Spider) -> Item:
         """Store items to files.
 
         Parameters
@@ -50,6 +97,7 @@ class AppPipeline:
         """
         sp = Path(spider.settings["RESULT"])
         r = []
+        url = None
         for k in item:
             if item.get(k) == "" or item.get(k) is None:
                 msg = f"Field {k} is empty!"
@@ -61,14 +109,12 @@ class AppPipeline:
                 r.append(item["types"])
                 r.append(item["url"])
                 r.append(item["foreword"])
-                (sp / "foreword.txt").write_text(data="\n".join(r), encoding="utf-8")
+                target = sp / "foreword.txt"
             elif isinstance(item, Chapter):
                 r.append(item["title"])
                 r.append(item["content"])
-                (sp / f"{item['index']}.txt").write_text(
-                    data="\n".join(r),
-                    encoding="utf-8",
-                )
+                target = int(item["index"])
+                url = item.get("url")
             else:
                 msg = "Invalid item detected!"
                 raise DropItem(msg)
@@ -76,6 +122,8 @@ class AppPipeline:
             _logger.warning("Error url: %s", item.get("url", "Field url is not exist!"))
             msg = f"Field {key} is not exist!"
             raise DropItem(msg) from KeyError
+        # wait while the writer is full
+        await maybe_deferred_to_future(self.writer.put(target, "\n".join(r), url))
         return item
 
 
@@ -0,0 +1,251 @@
+"""Prefetch chapters whose url can be predicted from their index.
+
+Sites like metruyencv and truyenfull put the chapter index in the url
+(``/chuong-{index}/``), so the next chapters can be requested before the
+current one is parsed. The prediction is checked against the next link of
+every parsed page, on a mismatch the prefetcher falls back to following the
+links of the site. A cached chapter without next link is read again from the
+website before it ends the novel.
+
+"""
+
+import logging
+import sys
+from collections.abc import Callable, Collection, Iterator
+from http import HTTPStatus
+
+from scrapy.http import Request, Response
+from twisted.python.failure import Failure
+from w3lib.url import canonicalize_url
+
+from getnovel.app.httpcache import refresh
+
+_logger = logging.getLogger(__name__)
+
+
+class ChapterPrefetcher:
+    """Keep a window of predicted chapter requests in flight.
+
+    Attributes
+    ----------
+    pattern : str
+        Url of the chapters, ``{index}`` is replaced by the chapter index.
+    stop : int
+        Stop crawling after this chapter, -1 to get all chapters.
+    window : int
+        Number of predicted chapters in flight.
+    end : int
+        Index of the last chapter that exists, as far as we know.
+    cursor : int
+        Index of the last predicted chapter.
+    inflight : int
+        Number of predicted chapters that are requested but not parsed yet.
+    follow : bool
+        True after a wrong prediction, next chapters are found by their link.
+    checked : set[int]
+        Index of the parsed chapters whose next link matched the prediction.
+    missing : set[int]
+        Index of the predicted chapters that were not found, the next link
+        of the chapter before tells if it is the end or a gap.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self: "ChapterPrefetcher",
+        pattern: str,
+        start: int,
+        stop: int,
+        window: int,
+        *,
+        callback: Callable,
+        errback: Callable,
+        skip: Collection[int] = (),
+    ) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        pattern : str
+            Url of the chapters, ``{index}`` is replaced by the chapter index.
+        start : int
+            Start crawling from this chapter.
+        stop : int
+            Stop crawling after this chapter, input -1 to get all chapters.
+        window : int
+            Number of predicted chapters in flight.
+        callback : Callable
+            Callback of the chapter requests, it must call :meth:`accept`
+            and :meth:`advance`.
+        errback : Callable
+            Errback of the chapter requests, it must call :meth:`failed`.
+        skip : Collection[int], optional
+            Index of the chapters that are already downloaded, by default ().
+        """
+        self.pattern = pattern
+        self.start = start
+        self.stop = stop
+        self.window = max(1, window)
+        self.callback = callback
+        self.errback = errback
+        self.end = stop if stop > -1 else sys.maxsize
+        self.cursor = start - 1
+        self.inflight = 0
+        self.follow = False
+        self.skip = set(skip)
+        self.checked: set[int] = set()
+        self.missing: set[int] = set()
+
+    def url(self: "ChapterPrefetcher", index: int) -> str:
+        """Predict the url of a chapter."""
+        return self.pattern.format(index=index)
+
+    def fill(self: "ChapterPrefetcher") -> Iterator[Request]:
+        """Request predicted chapters until the window is full.
+
+        Yields
+        ------
+        Request
+            Request to a predicted chapter.
+        """
+        while (
+            not self.follow and self.inflight < self.window and self.cursor < self.end
+        ):
+            self.cursor += 1
+            if self.cursor in self.skip:
+                continue
+            self.inflight += 1
+            yield Request(
+                url=self.url(self.cursor),
+                meta={
+                    "index": self.cursor,
+                    "prefetch": True,
+                    "handle_httpstatus_list": [404],
+                },
+                callback=self.callback,
+                errback=self.errback,
+                priority=-self.cursor,
+                dont_filter=True,
+            )
+
+    def wanted(self: "ChapterPrefetcher", request: Request) -> bool:
+        """Check if a request is still needed, without any bookkeeping.
+
+        Parameters
+        ----------
+        request : Request
+            The request to check.
+
+        Returns
+        -------
+        bool
+            False if the request is a prediction beyond the end of the novel.
+        """
+        return not request.meta.get("prefetch") or request.meta["index"] <= self.end
+
+    def accept(self: "ChapterPrefetcher", res: Response) -> bool:
+        """Check if a response should be parsed.
+
+        A 404 on a predicted chapter marks the end of the novel if the
+        chapter before links to it. When the chapter before is not parsed
+        yet, :meth:`advance` decides: a link past the missing chapter is a
+        gap and the links are followed from there.
+
+        Parameters
+        ----------
+        res : Response
+            The response to check.
+
+        Returns
+        -------
+        bool
+            False if the response must be dropped.
+        """
+        if not res.meta.get("prefetch"):
+            return True
+        self.inflight = max(0, self.inflight - 1)
+        if res.status == HTTPStatus.NOT_FOUND:
+            index = res.meta["index"]
+            if index - 1 in self.checked or index <= self.start:
+                self.end = min(self.end, index - 1)
+            elif index - 1 in self.skip:  # downloaded before, its link is unknown
+                _logger.warning("Chapter %s is not found, stop here.", index)
+                self.end = min(self.end, index - 1)
+            else:
+                self.missing.add(index)
+            return False
+        return res.meta["index"] <= self.end
+
+    def advance(
+        self: "ChapterPrefetcher",
+        res: Response,
+        neu: str | None,
+    ) -> Iterator[Request]:
+        """Validate the prediction of the next chapter and refill the window.
+
+        Parameters
+        ----------
+        res : Response
+            The parsed chapter.
+        neu : str | None
+            Link to the next chapter found in the page, None if there is no
+            next chapter.
+
+        Yields
+        ------
+        Request
+            Request to the next chapters.
+        """
+        index = res.meta["index"]
+        if self.follow and res.meta.get("prefetch") and index != self.end:
+            return  # only the chain from the wrong prediction goes on
+        if (neu is None) and (retry := refresh(res)) is not None:
+            retry.meta.pop("prefetch", None)  # already out of the window
+            yield retry  # a cached last chapter may link to a new one now
+            return
+        if self.follow:
+            if (neu is None) or (index == self.stop):
+                return
+            yield res.follow(
+                url=neu,
+                meta={"index": index + 1},
+                callback=self.callback,
+                errback=self.errback,
+            )
+            return
+        if neu is None:
+            self.end = min(self.end, index)
+            return
+        if (index < self.end) and (
+            canonicalize_url(res.urljoin(neu)) != canonicalize_url(self.url(index + 1))
+        ):
+            if index + 1 in self.missing:
+                _logger.info("Chapter %s is missing, follow links.", index + 1)
+            else:
+                _logger.info("Wrong prediction after chapter %s, follow links.", index)
+            self.follow = True
+            self.end = min(self.end, index)
+            yield from self.advance(res, neu)
+            return
+        self.checked.add(index)
+        if index + 1 in self.missing:  # the chapter links to a missing page
+            self.end = min(self.end, index)
+        yield from self.fill()
+
+    def failed(self: "ChapterPrefetcher", failure: Failure) -> Iterator[Request]:
+        """Account for a predicted chapter that could not be downloaded.
+
+        Parameters
+        ----------
+        failure : Failure
+            The failure of the request.
+
+        Yields
+        ------
+        Request
+            Request to the next chapters.
+        """
+        request = failure.request
+        if request.meta.get("prefetch"):
+            self.inflight = max(0, self.inflight - 1)
+        if self.wanted(request):
+            _logger.error("Failed chapter %s: %s", request.meta["index"], failure.value)
+        yield from self.fill()
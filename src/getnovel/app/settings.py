@@ -8,3 +8,5 @@ USER_AGENT = (
     "(KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36 Edg/108.0.1462.54"
 )
 COOKIES_ENABLED = False
+FANOUT = True
+PREFETCH_WINDOW = 8
@@ -9,11 +9,17 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Request, Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import HarvestTocMixin
 
+TITLE_XPATH = compile_xpath('//*[@id="chapter"]/header/h2/text()')
+CONTENT_XPATH = compile_xpath('//*[@id="chapter-content"]/text()')
 
-class DTruyenSpider(Spider):
+
+class DTruyenSpider(HarvestTocMixin, Spider):
     """Define spider for domain: dtruyen.
 
     Attributes
@@ -24,11 +30,14 @@ class DTruyenSpider(Spider):
         Position of the title in the novel url.
     lang : str
         Language code of novel.
+    toc_page_size : int
+        Number of chapters in a page of the table of content.
     """
 
     name = "dtruyen"
     title_pos = -2
     lang_code = "vi"
+    toc_page_size = 30
 
     def __init__(self: "DTruyenSpider", url: str, start: int, stop: int) -> None:
         """Initialize attributes.
@@ -62,10 +71,12 @@ class DTruyenSpider(Spider):
             Request to the table of content.
         """
         yield get_info(res)
-        total_chap = 30
+        if self.settings.getbool("FANOUT"):
+            yield from self.harvest_toc(res)
+            return
         sa = self.sa - 1
-        menu_page_have_start_chap = sa // total_chap + 1
-        pos_of_start_chap_in_menu = sa % total_chap + 1
+        menu_page_have_start_chap = sa // self.toc_page_size + 1
+        pos_of_start_chap_in_menu = sa % self.toc_page_size + 1
         yield Request(
             url=f"{res.url}{menu_page_have_start_chap}/",
             meta={
@@ -91,10 +102,40 @@ class DTruyenSpider(Spider):
             url=res.xpath(
                 f'(//*[@id="chapters"]/ul//a/@href)[{res.meta["pos_start"]}]',
             ).get(),
-            meta={"id": self.sa},
+            meta={"index": self.sa},
             callback=self.parse_content,
         )
 
+    def toc_request(self: "DTruyenSpider", page: int) -> Request:
+        """Make the request of a page of the table of content.
+
+        Parameters
+        ----------
+        page : int
+            Number of the page, the first page is 1.
+
+        Returns
+        -------
+        Request
+            Request to the page.
+        """
+        return Request(url=f"{self.info_url}{page}/")
+
+    def toc_links(self: "DTruyenSpider", res: Response) -> list[str]:
+        """Extract links of the chapters in a page of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The response to parse.
+
+        Returns
+        -------
+        list[str]
+            Links of the chapters, in order.
+        """
+        return res.xpath('//*[@id="chapters"]/ul//a/@href').getall()
+
     def parse_content(self: "DTruyenSpider", res: Response) -> None:
         """Extract content.
 
@@ -112,14 +153,22 @@ class DTruyenSpider(Spider):
             Request to the next chapter.
         """
         if res.xpath('//*[@id="pre-vip"]/text()').get():
+            if self.settings.getbool("FANOUT"):
+                self.logger.info("Skip VIP chapter %s", res.meta["index"])
+                return
             raise CloseSpider(reason="Reached VIP Chapters!")
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         neu = res.xpath('//*[@id="chapter"]/div[1]/a[4]/@href').get()
-        if (neu == "#") or (res.meta["id"] == self.so):
+        if (neu == "#") and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
+        if (neu == "#") or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
             url=neu,
-            meta={"id": res.meta["id"] + 1},
+            meta={"index": res.meta["index"] + 1},
             callback=self.parse_content,
         )
 
@@ -160,9 +209,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("id", str(res.meta["id"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//*[@id="chapter"]/header/h2/text()')
-    r.add_xpath("content", '//*[@id="chapter-content"]/text()')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
@@ -6,11 +6,16 @@
 """
 
 from scrapy import Spider
-from scrapy.exceptions import CloseSpider
-from scrapy.http import Request, Response
+from scrapy.http import Response
+from twisted.python.failure import Failure
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.prefetch import ChapterPrefetcher
+
+TITLE_XPATH = compile_xpath('//div[contains(@class,"nh-read__title")]/text()')
+CONTENT_XPATH = compile_xpath('//div[@id="article"]/text()')
 
 
 class MeTruyenCVSpider(Spider):
@@ -43,9 +48,10 @@ class MeTruyenCVSpider(Spider):
             Stop crawling after this chapter, input -1 to get all chapters.
         """
         self.start_urls = [url]
-        self.start = int(start)
-        self.stop = int(stop)
+        self.sa = int(start)
+        self.so = int(stop)
         self.total = 0  # total number of chapters.
+        self.prefetcher: ChapterPrefetcher = None
 
     def parse(self: "MeTruyenCVSpider", res: Response) -> None:
         """Extract info and send request to the start chapter.
@@ -60,15 +66,20 @@ class MeTruyenCVSpider(Spider):
         Info
             Info item.
         Request
-            Request to the start chapter.
+            Request to the first chapters.
         """
         yield get_info(res)
         self.total = int(res.xpath('//a[@id="nav-tab-chap"]/span[2]/text()').get())
-        yield Request(
-            url=f"{res.url}/chuong-{self.start}/",
-            meta={"index": self.start},
+        self.prefetcher = ChapterPrefetcher(
+            pattern=f"{res.url}/chuong-{{index}}/",
+            start=self.sa,
+            stop=self.total if self.so == -1 else min(self.so, self.total),
+            window=self.settings.getint("PREFETCH_WINDOW"),
             callback=self.parse_content,
+            errback=self.parse_error,
+            skip=self.settings.getlist("SKIP_CHAPTERS"),
         )
+        yield from self.prefetcher.fill()
 
     def parse_content(self: "MeTruyenCVSpider", res: Response) -> None:
         """Extract content.
@@ -84,17 +95,30 @@ class MeTruyenCVSpider(Spider):
             Chapter item.
 
         Request
-            Request to the next chapter.
+            Request to the next chapters.
         """
+        if not self.prefetcher.accept(res):
+            return
         yield get_content(res)
-        if (res.meta["index"] >= self.total) or (res.meta["index"] == self.stop):
-            raise CloseSpider(reason="done")
-        neu = f'{res.url.rsplit("/", 2)[0]}/chuong-{res.meta["index"] + 1!s}/'
-        yield Request(
-            url=neu,
-            meta={"index": res.meta["index"] + 1},
-            callback=self.parse_content,
-        )
+        # chapter urls only depend on the index, the total bounds the novel
+        index = res.meta["index"]
+        neu = None if index >= self.total else self.prefetcher.url(index + 1)
+        yield from self.prefetcher.advance(res, neu)
+
+    def parse_error(self: "MeTruyenCVSpider", failure: Failure) -> None:
+        """Handle failed chapter requests.
+
+        Parameters
+        ----------
+        failure : Failure
+            The failure of the request.
+
+        Yields
+        ------
+        Request
+            Request to the next chapters.
+        """
+        yield from self.prefetcher.failed(failure)
 
 
 def get_info(res: Response) -> Info:
@@ -133,9 +157,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//div[contains(@class,"nh-read__title")]/text()')
-    r.add_xpath("content", '//div[@id="article"]/text()')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
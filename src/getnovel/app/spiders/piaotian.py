@@ -9,8 +9,14 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import fan_out
+
+TITLE_XPATH = compile_xpath("//h1/text()")
+CONTENT_XPATH = compile_xpath("//body/text()")
 
 
 class PiaotianSpider(Spider):
@@ -78,8 +84,19 @@ class PiaotianSpider(Spider):
         Yields
         ------
         Request
-            Request to the start chapter.
+            Request to the start chapter, or to all chapters in fan-out mode.
         """
+        if self.settings.getbool("FANOUT"):
+            toc = res.xpath('//div[@class="centent"]//a/@href').getall()
+            yield from fan_out(
+                res=res,
+                toc=toc,
+                start=self.sa,
+                stop=self.so,
+                callback=self.parse_content,
+                skip=self.settings.getlist("SKIP_CHAPTERS"),
+            )
+            return
         yield res.follow(
             url=res.xpath(f'(//div[@class="centent"]//a/@href)[{self.sa}]').get(),
             meta={"index": self.sa},
@@ -103,7 +120,12 @@ class PiaotianSpider(Spider):
             Request to the next chapter.
         """
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         neu = res.xpath("//div[3]/a[3]/@href").get()
+        if ("i" in neu) and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
         if ("i" in neu) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -150,9 +172,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", "//h1/text()")
-    r.add_xpath("content", "//body/text()")
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
@@ -1,6 +1,6 @@
 """Get novel on domain 69shuba.
 
-   Note: Can't get all chapters if using start chapter,
+   Note: Can't get all chapters if using start chapter without fan-out,
    use -1 to get all chapters instead.
 
 .. _Website:
@@ -12,8 +12,14 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import fan_out
+
+TITLE_XPATH = compile_xpath("//div[3]//h1/text()")
+CONTENT_XPATH = compile_xpath('//div[@class="txtnav"]/text()')
 
 
 class SixNineShubaSpider(Spider):
@@ -83,8 +89,19 @@ class SixNineShubaSpider(Spider):
         Yields
         ------
         Request
-            Request to the start chapter.
+            Request to the start chapter, or to all chapters in fan-out mode.
         """
+        if self.settings.getbool("FANOUT"):
+            toc = res.xpath('//*[@id="catalog"]//a/@href').getall()
+            yield from fan_out(
+                res=res,
+                toc=toc,
+                start=self.sa,
+                stop=self.so,
+                callback=self.parse_content,
+                skip=self.settings.getlist("SKIP_CHAPTERS"),
+            )
+            return
         su = res.xpath(f'(//*[@id="catalog"]//a/@href)[{self.sa}]').get()
         if su is None:
             self.logger.error(msg="Start chapter is greater than total chapter")
@@ -112,7 +129,12 @@ class SixNineShubaSpider(Spider):
             Request to the next chapter.
         """
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         neu = res.xpath("/html/body/div[2]/div[1]/div[4]/a[4]/@href").get()
+        if ("htm" in neu) and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
         if ("htm" in neu) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -158,9 +180,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", "//div[3]//h1/text()")
-    r.add_xpath("content", '//div[@class="txtnav"]/text()')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
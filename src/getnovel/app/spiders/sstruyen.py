@@ -9,9 +9,14 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
 
+TITLE_XPATH = compile_xpath('//*[@id="j_content"]//h2//text()')
+CONTENT_XPATH = compile_xpath('//*[@id="j_content"]//p/text()')
+
 
 class SSTruyenSpider(Spider):
     """Define spider for domain: sstruyen.
@@ -86,6 +91,9 @@ class SSTruyenSpider(Spider):
         """
         yield get_content(res)
         neu = res.xpath('//*[@id="j_content"]/div[3]//li[@class="next"]/a/@href').get()
+        if (neu is None) and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
         if (neu is None) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -131,9 +139,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//*[@id="j_content"]//h2//text()')
-    r.add_xpath("content", '//*[@id="j_content"]//p/text()')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
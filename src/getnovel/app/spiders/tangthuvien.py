@@ -9,8 +9,13 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Request, Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import fan_out
+
+TITLE_XPATH = compile_xpath("//div[5]//h2/text()")
+CONTENT_XPATH = compile_xpath('//div[contains(@class,"box-chap")]//text()')
 
 
 class TangThuVienSpider(Spider):
@@ -81,10 +86,20 @@ class TangThuVienSpider(Spider):
         Yields
         ------
         Request
-            Request to the start chapter.
+            Request to the start chapter, or to all chapters in fan-out mode.
         """
         self.t.extend(res.xpath("//a/@href").getall())
         self.n = len(self.t)
+        if self.settings.getbool("FANOUT"):
+            yield from fan_out(
+                res=res,
+                toc=self.t,
+                start=self.sa,
+                stop=self.so,
+                callback=self.parse_content,
+                skip=self.settings.getlist("SKIP_CHAPTERS"),
+            )
+            return
         yield Request(
             url=self.t[self.sa - 1],
             meta={"index": self.sa},
@@ -108,6 +123,8 @@ class TangThuVienSpider(Spider):
             Request to the next chapter.
         """
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         if (res.meta["index"] >= self.n) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield Request(
@@ -153,9 +170,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", "//div[5]//h2/text()")
-    r.add_xpath("content", '//div[contains(@class,"box-chap")]//text()')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
@@ -9,11 +9,19 @@ from scrapy import Selector, Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import FormRequest, Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import HarvestTocMixin
 
+TOC_API = "https://truyenchu.vn/api/services/list-chapter"
 
-class TruyenChuSpider(Spider):
+TITLE_XPATH = compile_xpath('//a[@class="chapter-title"]//text()')
+CONTENT_XPATH = compile_xpath('//div[@id="chapter-c"]//text()[not(parent::script)]')
+
+
+class TruyenChuSpider(HarvestTocMixin, Spider):
     """Define spider for domain: truyenchu.
 
     Attributes
@@ -24,11 +32,14 @@ class TruyenChuSpider(Spider):
         Position of the title in the novel url.
     lang : str
         Language code of novel.
+    toc_page_size : int
+        Number of chapters in a page of the table of content.
     """
 
     name = "truyenchu"
     title_pos = -1
     lang_code = "vi"
+    toc_page_size = 50
 
     def __init__(self: "TruyenChuSpider", url: str, start: int, stop: int) -> None:
         """Initialize attributes.
@@ -46,6 +57,7 @@ class TruyenChuSpider(Spider):
         self.sa = int(start)
         self.so = int(stop)
         self.c = "vi"  # language code
+        self.formdata: dict[str, str] = {}  # form of the list-chapter api
 
     def parse(self: "TruyenChuSpider", res: Response) -> None:
         """Extract info and send request to the table of content.
@@ -63,21 +75,23 @@ class TruyenChuSpider(Spider):
             Request to the table of content.
         """
         yield get_info(res)
-        total_chap = 50
+        self.formdata = {
+            "type": "list_chapter",
+            "tid": res.xpath('//input[@id="truyen-id"]/@value').get(),
+            "tascii": res.xpath('//input[@id="truyen-ascii"]/@value').get(),
+        }
+        if self.settings.getbool("FANOUT"):
+            yield from self.harvest_toc(res)
+            return
         start_chap = self.sa - 1
-        menu_page_have_start_chap = start_chap // total_chap + 1
-        pos_of_start_chap_in_menu = start_chap % total_chap
+        menu_page_have_start_chap = start_chap // self.toc_page_size + 1
+        pos_of_start_chap_in_menu = start_chap % self.toc_page_size
         yield FormRequest(
             method="GET",
-            url="https://truyenchu.vn/api/services/list-chapter",
+            url=TOC_API,
             meta={"pos_start": pos_of_start_chap_in_menu},
             callback=self.parse_toc,
-            formdata={
-                "type": "list_chapter",
-                "tid": res.xpath('//input[@id="truyen-id"]/@value').get(),
-                "tascii": res.xpath('//input[@id="truyen-ascii"]/@value').get(),
-                "page": str(menu_page_have_start_chap),
-            },
+            formdata={**self.formdata, "page": str(menu_page_have_start_chap)},
         )
 
     def parse_toc(self: "TruyenChuSpider", res: Response) -> None:
@@ -102,6 +116,40 @@ class TruyenChuSpider(Spider):
             callback=self.parse_content,
         )
 
+    def toc_request(self: "TruyenChuSpider", page: int) -> FormRequest:
+        """Make the request of a page of the table of content.
+
+        Parameters
+        ----------
+        page : int
+            Number of the page, the first page is 1.
+
+        Returns
+        -------
+        FormRequest
+            Request to the page.
+        """
+        return FormRequest(
+            method="GET",
+            url=TOC_API,
+            formdata={**self.formdata, "page": str(page)},
+        )
+
+    def toc_links(self: "TruyenChuSpider", res: Response) -> list[str]:
+        """Extract links of the chapters in a page of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The response to parse.
+
+        Returns
+        -------
+        list[str]
+            Links of the chapters, in order.
+        """
+        return Selector(text=res.json()["chap_list"]).xpath("//li//a/@href").getall()
+
     def parse_content(self: "TruyenChuSpider", res: Response) -> None:
         """Extract content.
 
@@ -119,7 +167,12 @@ class TruyenChuSpider(Spider):
             Request to the next chapter.
         """
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         neu = res.xpath('//a[@id="next_chap"]/@href').get()
+        if (neu == "#") and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
         if (neu == "#") or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -166,9 +219,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//a[@class="chapter-title"]//text()')
-    r.add_xpath("content", '//div[@id="chapter-c"]//text()[not(parent::script)]')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
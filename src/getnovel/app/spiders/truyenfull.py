@@ -6,11 +6,19 @@
 """
 
 from scrapy import Spider
-from scrapy.exceptions import CloseSpider
 from scrapy.http import Response
+from twisted.python.failure import Failure
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.prefetch import ChapterPrefetcher
+
+TITLE_XPATH = compile_xpath('//a[@class="chapter-title"]//text()')
+CONTENT_XPATH = compile_xpath(
+    '//div[@id="chapter-c"]//text()[parent::i or parent::div or parent::p'
+    ' and not(ancestor::div[contains(@class, "ads-network")])]',
+)
 
 
 class TruyenFullSpider(Spider):
@@ -45,6 +53,7 @@ class TruyenFullSpider(Spider):
         self.start_urls = [url]
         self.sa = int(start)
         self.so = int(stop)
+        self.prefetcher: ChapterPrefetcher = None
 
     def parse(self: "TruyenFullSpider", res: Response) -> None:
         """Extract info and send request to the start chapter.
@@ -59,14 +68,19 @@ class TruyenFullSpider(Spider):
         Info
             Info item.
         Request
-            Request to the start chapter.
+            Request to the first chapters.
         """
         yield get_info(res)
-        yield res.follow(
-            url=f"chuong-{self.sa}/",
-            meta={"index": self.sa},
+        self.prefetcher = ChapterPrefetcher(
+            pattern=res.urljoin("chuong-{index}/"),
+            start=self.sa,
+            stop=self.so,
+            window=self.settings.getint("PREFETCH_WINDOW"),
             callback=self.parse_content,
+            errback=self.parse_error,
+            skip=self.settings.getlist("SKIP_CHAPTERS"),
         )
+        yield from self.prefetcher.fill()
 
     def parse_content(self: "TruyenFullSpider", res: Response) -> None:
         """Extract content.
@@ -82,17 +96,30 @@ class TruyenFullSpider(Spider):
             Chapter item.
 
         Request
-            Request to the next chapter.
+            Request to the next chapters.
         """
+        if not self.prefetcher.accept(res):
+            return
         yield get_content(res)
         neu = res.xpath('//a[@id="next_chap"]/@href').get()
-        if ("h" not in neu) or (res.meta["index"] == self.so):
-            raise CloseSpider(reason="done")
-        yield res.follow(
-            url=neu,
-            meta={"index": res.meta["index"] + 1},
-            callback=self.parse_content,
-        )
+        if (neu is not None) and ("h" not in neu):
+            neu = None  # the last chapter has no next link
+        yield from self.prefetcher.advance(res, neu)
+
+    def parse_error(self: "TruyenFullSpider", failure: Failure) -> None:
+        """Handle failed chapter requests.
+
+        Parameters
+        ----------
+        failure : Failure
+            The failure of the request.
+
+        Yields
+        ------
+        Request
+            Request to the next chapters.
+        """
+        yield from self.prefetcher.failed(failure)
 
 
 def get_info(res: Response) -> Info:
@@ -131,13 +158,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//a[@class="chapter-title"]//text()')
-    r.add_xpath(
-        "content",
-        '//div[@id="chapter-c"]//text()[parent::i or parent::div or parent::p'
-        ' and not(ancestor::div[contains(@class, "ads-network")])]',
-    )
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
@@ -5,15 +5,23 @@
 
 """
 
+from urllib.parse import urljoin
+
 from scrapy import Spider
 from scrapy.exceptions import CloseSpider
-from scrapy.http import Response
+from scrapy.http import Request, Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.httpcache import refresh
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import HarvestTocMixin
+
+TITLE_XPATH = compile_xpath("//div[2]//h1/span/text() | //div[2]//h2/text()")
+CONTENT_XPATH = compile_xpath('//*[@id="inner_chap_content_1"]/p/text()')
 
 
-class TruyenYYSpider(Spider):
+class TruyenYYSpider(HarvestTocMixin, Spider):
     """Define spider for domain: truyenyy.
 
     Attributes
@@ -24,11 +32,14 @@ class TruyenYYSpider(Spider):
         Position of the title in the novel url.
     lang : str
         Language code of novel.
+    toc_page_size : int
+        Number of chapters in a page of the table of content.
     """
 
     name = "truyenyy"
     title_pos = -2
     lang_code = "vi"
+    toc_page_size = 40
 
     def __init__(self: "TruyenYYSpider", url: str, start: int, stop: int) -> None:
         """Initialize attributes.
@@ -62,10 +73,12 @@ class TruyenYYSpider(Spider):
             Request to the table of content.
         """
         yield get_info(res)
-        total_chap = 40
+        if self.settings.getbool("FANOUT"):
+            yield from self.harvest_toc(res)
+            return
         start_chap = self.sa - 1
-        menu_page_have_start_chap = start_chap // total_chap + 1
-        pos_of_start_chap_in_menu = start_chap % total_chap
+        menu_page_have_start_chap = start_chap // self.toc_page_size + 1
+        pos_of_start_chap_in_menu = start_chap % self.toc_page_size
         yield res.follow(
             url=f"danh-sach-chuong/?p={menu_page_have_start_chap}",
             meta={"pos_start": pos_of_start_chap_in_menu},
@@ -93,6 +106,36 @@ class TruyenYYSpider(Spider):
             callback=self.parse_content,
         )
 
+    def toc_request(self: "TruyenYYSpider", page: int) -> Request:
+        """Make the request of a page of the table of content.
+
+        Parameters
+        ----------
+        page : int
+            Number of the page, the first page is 1.
+
+        Returns
+        -------
+        Request
+            Request to the page.
+        """
+        return Request(url=urljoin(self.info_url, f"danh-sach-chuong/?p={page}"))
+
+    def toc_links(self: "TruyenYYSpider", res: Response) -> list[str]:
+        """Extract links of the chapters in a page of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The response to parse.
+
+        Returns
+        -------
+        list[str]
+            Links of the chapters, in order.
+        """
+        return res.xpath("//div[2]//tbody//td/a/@href").getall()
+
     def parse_content(self: "TruyenYYSpider", res: Response) -> None:
         """Extract content.
 
@@ -110,9 +153,17 @@ class TruyenYYSpider(Spider):
             Request to the next chapter.
         """
         if res.xpath("//div[2]/div[2]/div[4]//div[2]").get():
+            if self.settings.getbool("FANOUT"):
+                self.logger.info("Skip VIP chapter %s", res.meta["index"])
+                return
             raise CloseSpider(reason="Reached vip chapters!")
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         neu = res.xpath("//div[2]/div[2]/a/@href").get()
+        if (neu is None) and (retry := refresh(res)) is not None:
+            yield retry  # a cached last chapter may link to a new one now
+            return
         if (neu is None) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -158,15 +209,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath(
-        "title",
-        "//div[2]//h1/span/text() | //div[2]//h2/text()",
-    )
-    r.add_xpath(
-        "content",
-        '//*[@id="inner_chap_content_1"]/p/text()',
-    )
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
@@ -9,8 +9,13 @@ from scrapy import Spider
 from scrapy.exceptions import CloseSpider
 from scrapy.http import Response
 
-from getnovel.app.itemloaders import ChapterLoader, InfoLoader
+from getnovel.app.extractors import compile_xpath, extract_chapter
+from getnovel.app.itemloaders import InfoLoader
 from getnovel.app.items import Chapter, Info
+from getnovel.app.toc import fan_out
+
+TITLE_XPATH = compile_xpath('//*[@id="timu"]/text()')
+CONTENT_XPATH = compile_xpath('//*[@id="contentbox"]//text()[not(parent::script)]')
 
 
 class UukanshuSpider(Spider):
@@ -61,12 +66,22 @@ class UukanshuSpider(Spider):
         Info
             Info item.
         Request
-            Request to the start chapter.
+            Request to the start chapter, or to all chapters in fan-out mode.
         """
         yield get_info(res)
         self.t.extend(res.xpath('//*[@id="chapterList"]/li/a/@href').getall())
         self.t.reverse()
         self.n = len(self.t)
+        if self.settings.getbool("FANOUT"):
+            yield from fan_out(
+                res=res,
+                toc=self.t,
+                start=self.sa,
+                stop=self.so,
+                callback=self.parse_content,
+                skip=self.settings.getlist("SKIP_CHAPTERS"),
+            )
+            return
         yield res.follow(
             url=self.t[self.sa - 1],
             meta={"index": self.sa},
@@ -90,6 +105,8 @@ class UukanshuSpider(Spider):
             Request to the next chapter.
         """
         yield get_content(res)
+        if self.settings.getbool("FANOUT"):
+            return
         if (res.meta["index"] >= self.n) or (res.meta["index"] == self.so):
             raise CloseSpider(reason="done")
         yield res.follow(
@@ -138,9 +155,4 @@ def get_content(res: Response) -> Chapter:
     Chapter
         Populated Chapter item.
     """
-    r = ChapterLoader(item=Chapter(), response=res)
-    r.add_value("index", str(res.meta["index"]))
-    r.add_value("url", res.url)
-    r.add_xpath("title", '//*[@id="timu"]/text()')
-    r.add_xpath("content", '//*[@id="contentbox"]//text()[not(parent::script)]')
-    return r.load_item()
+    return extract_chapter(res, title=TITLE_XPATH, content=CONTENT_XPATH)
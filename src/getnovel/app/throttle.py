@@ -0,0 +1,195 @@
+"""Adapt the budget of a website to its errors.
+
+AutoThrottle only looks at the latency, it keeps sending requests to a
+website that answers with 429, 503 or an anti-bot page. :class:`AimdThrottle`
+follows the AIMD rule on the concurrency of a
+:class:`~getnovel.app.budget.DomainBudget` instead:
+
+- additive increase: the concurrency grows by one for each window of clean
+  responses, up to ``max_concurrency``.
+- multiplicative decrease: the concurrency is halved on a 429, a 503, a
+  timeout or a block page. When it is already one, the delay is doubled, and
+  it goes back to the delay of the policy before the concurrency grows again.
+
+``Retry-After`` pauses the whole website.
+
+"""
+
+import logging
+import time
+from collections.abc import Iterable
+from email.utils import parsedate_to_datetime
+
+from scrapy.http import Request, Response, TextResponse
+
+from getnovel.app.budget import DomainBudget
+
+_logger = logging.getLogger(__name__)
+
+THROTTLES: dict[str, "AimdThrottle"] = {}  # throttle of each spider name
+BLOCK_STATUSES = (403, 503)  # statuses of the challenge pages
+
+
+class AimdThrottle:
+    """Additive increase, multiplicative decrease of the concurrency.
+
+    Attributes
+    ----------
+    budget : DomainBudget
+        The budget to adapt.
+    max_delay : float
+        Ceiling of the delay.
+    base_delay : float
+        Delay of the policy, the delay never goes below it.
+    limit : float
+        Concurrency, the budget uses its integer part.
+    epoch : int
+        Number of decreases, errors of requests sent before the last decrease
+        do not decrease again.
+    """
+
+    def __init__(self: "AimdThrottle", budget: DomainBudget, max_delay: float) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        budget : DomainBudget
+            The budget to adapt.
+        max_delay : float
+            Ceiling of the delay.
+        """
+        self.budget = budget
+        self.max_delay = max_delay
+        self.base_delay = budget.delay
+        self.limit = float(budget.concurrency)
+        self.epoch = 0
+
+    def stamp(self: "AimdThrottle", request: Request) -> None:
+        """Remember the epoch in which a request is sent."""
+        request.meta["throttle_epoch"] = self.epoch
+
+    def increase(self: "AimdThrottle") -> None:
+        """Account for a clean response."""
+        if self.budget.delay > self.base_delay:
+            # half way back to the delay of the policy
+            self.budget.delay = (self.budget.delay + self.base_delay) / 2
+            if self.budget.delay - self.base_delay < 0.01:  # noqa: PLR2004
+                self.budget.delay = self.base_delay
+            return
+        self.limit = min(self.budget.max_concurrency, self.limit + 1 / self.limit)
+        self.budget.concurrency = int(self.limit)
+
+    def decrease(self: "AimdThrottle", request: Request, reason: str) -> bool:
+        """Account for an error of the website.
+
+        Parameters
+        ----------
+        request : Request
+            The request that failed.
+        reason : str
+            Reason of the error, for the log.
+
+        Returns
+        -------
+        bool
+            False if the budget was already decreased after the request
+            was sent.
+        """
+        if request.meta.get("throttle_epoch", self.epoch) != self.epoch:
+            return False
+        self.epoch += 1
+        if self.limit >= 2:  # noqa: PLR2004
+            self.limit /= 2
+            self.budget.concurrency = int(self.limit)
+        else:
+            self.limit = 1.0
+            self.budget.concurrency = 1
+            self.budget.delay = min(self.max_delay, max(1.0, self.budget.delay * 2))
+        _logger.info(
+            "Throttle %s (%s): concurrency %s, delay %.1fs",
+            request.url,
+            reason,
+            self.budget.concurrency,
+            self.budget.delay,
+        )
+        return True
+
+
+def get_throttle(
+    name: str,
+    budget: DomainBudget,
+    max_delay: float,
+) -> AimdThrottle:
+    """Get the throttle shared by all crawlers of a spider.
+
+    Parameters
+    ----------
+    name : str
+        Name of the spider.
+    budget : DomainBudget
+        The budget of the spider.
+    max_delay : float
+        Ceiling of the delay.
+
+    Returns
+    -------
+    AimdThrottle
+        The throttle of the spider, it is created by the first crawler.
+    """
+    if name not in THROTTLES:
+        THROTTLES[name] = AimdThrottle(budget, max_delay)
+    return THROTTLES[name]
+
+
+def retry_after(response: Response) -> float | None:
+    """Get the seconds to wait from the ``Retry-After`` header.
+
+    Parameters
+    ----------
+    response : Response
+        The response to check.
+
+    Returns
+    -------
+    float | None
+        Seconds to wait, None if the header is missing or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.decode("latin-1").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+def is_blocked(response: Response, markers: Iterable[str]) -> bool:
+    """Check if a response is an anti-bot page.
+
+    Challenge pages are answered with a 403 or a 503, the body of the other
+    responses is never scanned: some markers, like the script of the
+    challenge platform, are also injected in the normal pages.
+
+    Parameters
+    ----------
+    response : Response
+        The response to check.
+    markers : Iterable[str]
+        Texts that only appear in anti-bot pages.
+
+    Returns
+    -------
+    bool
+        True if the response is marked as a challenge or is a 403 or a 503
+        that contains one of the markers.
+    """
+    if response.headers.get("cf-mitigated", b"").lower() == b"challenge":
+        return True
+    if response.status not in BLOCK_STATUSES:
+        return False
+    if not isinstance(response, TextResponse):
+        return False
+    return any(m in response.text for m in markers)
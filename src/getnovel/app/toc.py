@@ -0,0 +1,337 @@
+"""Schedule chapters from a table of content.
+
+Spiders that know the url of every chapter do not need to walk from one
+chapter to the next, all chapters can be queued at once and the downloader
+keeps ``CONCURRENT_REQUESTS_PER_DOMAIN`` of them in flight. Paginated tables
+of content are collected by :class:`TocHarvester` first, spiders get the
+requests and callbacks of the harvest from :class:`HarvestTocMixin`.
+
+"""
+
+import abc
+import logging
+import sys
+from collections.abc import Callable, Collection, Iterator
+from http import HTTPStatus
+
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Request, Response
+from scrapy.spidermiddlewares.httperror import HttpError
+from twisted.python.failure import Failure
+
+_logger = logging.getLogger(__name__)
+
+
+def fan_out(  # noqa: PLR0913
+    res: Response | None,
+    toc: list[str | None],
+    start: int,
+    stop: int,
+    *,
+    callback: Callable,
+    skip: Collection[int] = (),
+) -> Iterator[Request]:
+    """Request every chapter from start to stop at once.
+
+    Parameters
+    ----------
+    res : Response | None
+        The response that the table of content was extracted from,
+        relative urls are resolved against it. None if all urls are absolute.
+    toc : list[str | None]
+        Url of the chapters, the first item is chapter 1. Chapters
+        without url are skipped.
+    start : int
+        Start crawling from this chapter.
+    stop : int
+        Stop crawling after this chapter, input -1 to get all chapters.
+    callback : Callable
+        Callback of the chapter requests.
+    skip : Collection[int], optional
+        Index of the chapters that are already downloaded, by default ().
+
+    Yields
+    ------
+    Request
+        Request to a chapter, its index is stored in the meta.
+    """
+    follow = Request if res is None else res.follow
+    skip = set(skip)
+    last = len(toc) if stop == -1 else min(stop, len(toc))
+    for index in range(start, last + 1):
+        if index in skip:
+            continue
+        if toc[index - 1] is None:
+            _logger.warning("Missing url of chapter %s", index)
+            continue
+        yield follow(
+            url=toc[index - 1],
+            meta={"index": index},
+            callback=callback,
+            priority=-index,  # download chapters in order as far as possible
+        )
+
+
+class TocHarvester:
+    """Download the pages of a paginated table of content concurrently.
+
+    The number of pages is not known beforehand, pages are requested in a
+    window until a page is short, empty or repeats another page.
+
+    Attributes
+    ----------
+    page_size : int
+        Number of chapters in a full page.
+    first : int
+        First page that contains a wanted chapter.
+    last : int
+        Last page that contains a wanted chapter, as far as we know.
+    window : int
+        Number of pages in flight.
+    offline : bool
+        True if pages are only read from the HTTP cache.
+    pages : dict[int, list[str]]
+        Absolute url of the chapters of the received pages.
+    """
+
+    def __init__(
+        self: "TocHarvester",
+        page_size: int,
+        start: int,
+        stop: int,
+        window: int,
+        *,
+        offline: bool = False,
+    ) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        page_size : int
+            Number of chapters in a full page.
+        start : int
+            Start crawling from this chapter.
+        stop : int
+            Stop crawling after this chapter, input -1 to get all chapters.
+        window : int
+            Number of pages in flight.
+        offline : bool, optional
+            True if pages are only read from the HTTP cache, by default False.
+        """
+        self.page_size = page_size
+        self.first = (start - 1) // page_size + 1
+        self.last = (stop - 1) // page_size + 1 if stop > -1 else sys.maxsize
+        self.window = max(1, window)
+        self.offline = offline
+        self.pages: dict[int, list[str]] = {}
+        self.seen: dict[str, int] = {}  # page of each url
+        self.next = self.first  # next page to request
+        self.pending: set[int] = set()  # requested pages that are not received yet
+
+    @property
+    def done(self: "TocHarvester") -> bool:
+        """Return True when all pages of the table of content are received."""
+        return not self.pending and self.next > self.last
+
+    def request(self: "TocHarvester") -> Iterator[int]:
+        """Pick the pages to request until the window is full.
+
+        Yields
+        ------
+        int
+            Number of the page to request, it must be stored in the meta
+            with the key ``page``.
+        """
+        while len(self.pending) < self.window and self.next <= self.last:
+            self.pending.add(self.next)
+            self.next += 1
+            yield self.next - 1
+
+    def add(self: "TocHarvester", res: Response, links: list[str]) -> None:
+        """Store the chapter links of a page.
+
+        Parameters
+        ----------
+        res : Response
+            The page of the table of content.
+        links : list[str]
+            Links of the chapters in the page.
+        """
+        page = res.meta["page"]
+        self.pending.discard(page)
+        if len(links) < self.page_size:
+            self.last = min(self.last, page if links else page - 1)
+        links = [res.urljoin(link) for link in links]
+        for link in links:
+            other = self.seen.setdefault(link, page)
+            if other != page:  # out of range pages repeat the last page
+                self.last = min(self.last, max(page, other) - 1)
+        self.pages[page] = links
+
+    def failed(self: "TocHarvester", failure: Failure) -> None:
+        """Account for a page that could not be downloaded.
+
+        A 404 is handled like an empty page. Offline, a page that is not
+        in the cache is handled the same way: the page after the last one
+        was a 404 and 404 are not cached.
+
+        Parameters
+        ----------
+        failure : Failure
+            The failure of the request.
+        """
+        page = failure.request.meta["page"]
+        self.pending.discard(page)
+        status = failure.value.response.status if failure.check(HttpError) else None
+        if status == HTTPStatus.NOT_FOUND or (
+            self.offline and failure.check(IgnoreRequest)
+        ):
+            self.last = min(self.last, page - 1)
+        elif page <= self.last:
+            _logger.error("Failed page %s of the table of content", page)
+
+    def toc(self: "TocHarvester") -> list[str | None]:
+        """Merge the pages into the table of content.
+
+        Returns
+        -------
+        list[str | None]
+            Url of the chapters, the first item is chapter 1. Chapters of
+            missing pages are None.
+        """
+        result: list[str | None] = []
+        for page in range(1, self.last + 1):
+            links = self.pages.get(page, [None] * self.page_size)
+            result.extend(links)
+        return result
+
+
+class HarvestTocMixin(abc.ABC):
+    """Harvest a paginated table of content, then request all chapters.
+
+    Spiders call :meth:`harvest_toc` with the novel information page and
+    only define the request of a page and the links of a page. They need
+    the ``sa`` and ``so`` attributes (start and stop chapter) and a
+    ``parse_content`` callback.
+
+    Attributes
+    ----------
+    toc_page_size : int
+        Number of chapters in a full page of the table of content.
+    info_url : str
+        Url of the novel information page, after redirects.
+    harvester : TocHarvester
+        Pages of the table of content received so far.
+    """
+
+    toc_page_size: int
+
+    def harvest_toc(self: "HarvestTocMixin", res: Response) -> Iterator[Request]:
+        """Start the harvest of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The novel information page.
+
+        Yields
+        ------
+        Request
+            Request to the first pages of the table of content.
+        """
+        self.info_url = res.url
+        self.harvester = TocHarvester(
+            page_size=self.toc_page_size,
+            start=self.sa,
+            stop=self.so,
+            window=self.settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+            offline=self.settings.getbool("HTTPCACHE_IGNORE_MISSING"),
+        )
+        yield from self.request_toc()
+
+    @abc.abstractmethod
+    def toc_request(self: "HarvestTocMixin", page: int) -> Request:
+        """Make the request of a page of the table of content.
+
+        Parameters
+        ----------
+        page : int
+            Number of the page, the first page is 1.
+
+        Returns
+        -------
+        Request
+            Request to the page, the meta and callbacks are set by the caller.
+        """
+
+    @abc.abstractmethod
+    def toc_links(self: "HarvestTocMixin", res: Response) -> list[str]:
+        """Extract links of the chapters in a page of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The page of the table of content.
+
+        Returns
+        -------
+        list[str]
+            Links of the chapters, in order.
+        """
+
+    def request_toc(self: "HarvestTocMixin") -> Iterator[Request]:
+        """Request pages of the table of content until the window is full.
+
+        Yields
+        ------
+        Request
+            Request to a page of the table of content, or to all chapters
+            after the last page.
+        """
+        for page in self.harvester.request():
+            yield self.toc_request(page).replace(
+                meta={"page": page},
+                callback=self.parse_toc_page,
+                errback=self.parse_toc_error,
+            )
+        if self.harvester.done:
+            yield from fan_out(
+                res=None,
+                toc=self.harvester.toc(),
+                start=self.sa,
+                stop=self.so,
+                callback=self.parse_content,
+                skip=self.settings.getlist("SKIP_CHAPTERS"),
+            )
+
+    def parse_toc_page(self: "HarvestTocMixin", res: Response) -> Iterator[Request]:
+        """Store the links of a page of the table of content.
+
+        Parameters
+        ----------
+        res : Response
+            The response to parse.
+
+        Yields
+        ------
+        Request
+            Request to the next pages, or to all chapters after the last page.
+        """
+        self.harvester.add(res, self.toc_links(res))
+        yield from self.request_toc()
+
+    def parse_toc_error(self: "HarvestTocMixin", failure: Failure) -> Iterator[Request]:
+        """Handle failed pages of the table of content.
+
+        Parameters
+        ----------
+        failure : Failure
+            The failure of the request.
+
+        Yields
+        ------
+        Request
+            Request to the next pages, or to all chapters after the last page.
+        """
+        self.harvester.failed(failure)
+        yield from self.request_toc()
@@ -0,0 +1,184 @@
+"""Write files in a dedicated thread.
+
+Writing a chapter in the reactor thread stalls the downloads and the parsing
+while the disk (or NFS) is slow. :class:`FileWriter` queues the writes to a
+writer thread, which writes them in batches to files or to a
+:class:`~getnovel.utils.store.ChapterStore`. When ``max_pending`` writes are
+queued, :meth:`FileWriter.put` returns a Deferred that fires when there is
+room again, so the pipeline slows the crawl down instead of filling the
+memory.
+
+"""
+
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+
+from scrapy.statscollectors import StatsCollector
+from twisted.internet import threads
+from twisted.internet.defer import Deferred, succeed
+
+from getnovel.utils.store import ChapterStore
+
+_logger = logging.getLogger(__name__)
+
+_STOP = object()  # ask the writer thread to stop
+
+
+class FileWriter:
+    """Write text files in a dedicated thread, in batches.
+
+    Attributes
+    ----------
+    max_pending : int
+        Number of queued writes that triggers the backpressure.
+    batch_size : int
+        Max number of files written in a batch.
+    pending : int
+        Number of queued writes that are not written yet.
+    store : ChapterStore | None
+        Store of the chapters, it is only used by the writer thread.
+    """
+
+    def __init__(
+        self: "FileWriter",
+        max_pending: int,
+        batch_size: int,
+        stats: StatsCollector | None = None,
+    ) -> None:
+        """Initialize attributes.
+
+        Parameters
+        ----------
+        max_pending : int
+            Number of queued writes that triggers the backpressure.
+        batch_size : int
+            Max number of files written in a batch.
+        stats : StatsCollector | None, optional
+            Stats of the crawler, by default None.
+        """
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.stats = stats
+        self.pending = 0
+        self.store: ChapterStore | None = None
+        self.__queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__waiters: list[Deferred] = []
+        self.__thread: threading.Thread | None = None
+
+    def start(self: "FileWriter", store: ChapterStore | None = None) -> None:
+        """Start the writer thread.
+
+        Parameters
+        ----------
+        store : ChapterStore | None, optional
+            Store of the chapters, by default None.
+        """
+        self.store = store
+        self.__thread = threading.Thread(
+            target=self.__run,
+            name="getnovel-writer",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def put(
+        self: "FileWriter",
+        target: Path | int,
+        data: str,
+        url: str | None = None,
+    ) -> Deferred:
+        """Queue a write.
+
+        Parameters
+        ----------
+        target : Path | int
+            Path of the file, or index of the chapter in the store.
+        data : str
+            Text of the file.
+        url : str | None, optional
+            Page of the chapter, kept in the metadata of the store.
+
+        Returns
+        -------
+        Deferred
+            Fired when another write can be queued.
+        """
+        self.pending += 1
+        self.__queue.put((target, data, url, time.monotonic()))
+        if self.pending < self.max_pending:
+            return succeed(None)
+        d = Deferred()
+        self.__waiters.append(d)
+        return d
+
+    def close(self: "FileWriter") -> Deferred:
+        """Write the queued files and stop the thread.
+
+        Returns
+        -------
+        Deferred
+            Fired when all files are written.
+        """
+        if self.__thread is None:
+            return succeed(None)
+        self.__queue.put(_STOP)
+        return threads.deferToThread(self.__thread.join)
+
+    def __run(self: "FileWriter") -> None:
+        """Write the queued files until the stop order."""
+        from twisted.internet import reactor  # noqa: PLC0415
+
+        stop = False
+        while not stop:
+            batch = [self.__queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stop = True
+                batch.pop()
+            latencies = [self.__write(*job) for job in batch]
+            if batch:
+                reactor.callFromThread(self.__done, latencies)
+        if self.store is not None:
+            self.store.close()
+
+    def __write(
+        self: "FileWriter",
+        target: Path | int,
+        data: str,
+        url: str | None,
+        queued: float,
+    ) -> float:
+        """Write a file, return the seconds from the queue to the disk."""
+        try:
+            if isinstance(target, Path):
+                target.write_text(data=data, encoding="utf-8")
+            else:
+                self.store.write(target, data, url)
+        except Exception:  # the thread must live on, or the crawl waits forever
+            _logger.exception("Can not write %s", target)
+            return -1
+        return time.monotonic() - queued
+
+    def __done(self: "FileWriter", latencies: list[float]) -> None:
+        """Record a written batch and release the waiting writes."""
+        self.pending -= len(latencies)
+        if self.stats is not None:
+            errors = sum(1 for t in latencies if t < 0)
+            written = [t for t in latencies if t >= 0]
+            self.stats.inc_value("writer/batches")
+            self.stats.inc_value("writer/files", len(written))
+            if errors:
+                self.stats.inc_value("writer/errors", errors)
+            if written:
+                ms = [round(t * 1000) for t in written]
+                self.stats.inc_value("writer/latency_total_ms", sum(ms))
+                self.stats.max_value("writer/latency_max_ms", max(ms))
+        while self.__waiters and self.pending < self.max_pending:
+            self.__waiters.pop(0).callback(None)
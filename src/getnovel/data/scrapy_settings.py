@@ -35,7 +35,8 @@ def get_settings() -> dict:
         "IMAGES_STORE": str(gnp / "images"),
         # DOWNLOADER_MIDDLEWARES
         "DOWNLOADER_MIDDLEWARES": {
-            "getnovel.app.middlewares.AppDownloaderMiddleware": 500,
+            # after HttpCacheMiddleware, cached pages do not spend the budget
+            "getnovel.app.middlewares.AppDownloaderMiddleware": 950,
         },
         # LOG SETTINGS
         "LOG_FORMAT": "%(asctime)s [%(name)s] %(levelname)s: %(message)s",
@@ -44,15 +45,55 @@ def get_settings() -> dict:
         "LOG_FILE_APPEND": False,
         "LOG_LEVEL": "DEBUG",
         "COOKIES_ENABLED": False,
-        # AUTOTHROTTLE SETTINGS
-        "AUTOTHROTTLE_ENABLED": True,
-        "AUTOTHROTTLE_START_DELAY": 6,
-        "DOWNLOAD_DELAY": 3,
-        "AUTOTHROTTLE_MAX_DELAY": 60,
-        "AUTOTHROTTLE_TARGET_CONCURRENCY": 0.5,
+        # CONCURRENCY
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        "FANOUT": True,  # request all chapters of the table of content at once
+        "PREFETCH_WINDOW": 8,  # predicted chapters in flight
+        # BUDGET OF EACH WEBSITE, shared by all novels of the website
+        "DOWNLOAD_DELAY": 0,
+        "DOMAIN_POLICIES": {
+            "default": {
+                "delay": 3,
+                "concurrency": 2,
+                "burst": 2,
+                "max_concurrency": 4,
+            },
+            "truyenfull": {
+                "delay": 1,
+                "concurrency": 4,
+                "burst": 4,
+                "max_concurrency": 8,
+            },
+            "metruyencv": {
+                "delay": 2,
+                "concurrency": 2,
+                "burst": 3,
+                "max_concurrency": 4,
+            },
+        },
+        # THROTTLE, adapt the budget to the errors of the website
+        "THROTTLE_ENABLED": True,
+        "THROTTLE_MAX_DELAY": 60,
+        "THROTTLE_HTTP_CODES": [429, 503],
+        "THROTTLE_BLOCK_MARKERS": [
+            "cf-browser-verification",
+            "<title>Just a moment...</title>",
+        ],
         # CACHE
         "HTTPCACHE_ENABLED": True,
         "HTTPCACHE_DIR": str(gnp / "cache"),
+        "HTTPCACHE_STORAGE": "getnovel.app.httpcache.PackCacheStorage",
+        "HTTPCACHE_COMPRESSION": "zstd",  # gzip if zstd is not installed
+        "HTTPCACHE_MAX_BYTES": 2 * 1024**3,  # least recently used are evicted
+        "HTTPCACHE_PACK_BYTES": 64 * 1024**2,
+        "HTTPCACHE_POLICY": "getnovel.app.httpcache.NovelCachePolicy",
+        "HTTPCACHE_INDEX_TTL": 3600,  # info and table of content pages
+        # WRITER, chapters are written in a dedicated thread
+        "WRITER_MAX_PENDING": 256,  # the crawl waits when the writer is full
+        "WRITER_BATCH_SIZE": 32,
+        "CHAPTER_STORE": "directory",  # or "pack", a single file for all chapters
+        "CHAPTER_COMPRESS": False,  # zstd, only for the pack
+        "CHAPTER_DICT_SAMPLES": 32,  # chapters that train the zstd dictionary
         # SAVE PATH
         "RESULT": str(gnp / "raw"),
         "REQUEST_FINGERPRINTER_IMPLEMENTATION": "2.7",
@@ -0,0 +1,200 @@
+"""Write zip entries from compressed bytes.
+
+:class:`zipfile.ZipFile` always compresses the data it writes. An EPUB that is
+built again mostly holds the same entries, :func:`copy_entry` copies their
+compressed bytes from the old archive instead of compressing them again,
+:func:`write_bytes` does it when the data of an entry did not change.
+:func:`deflate` compresses an entry anywhere, in a worker process for
+example, and :func:`write_deflated` writes the result.
+
+The helpers use the internals of :class:`zipfile.ZipFile` that ``mkdir``
+uses to write an entry, they are stable from Python 3.11 to 3.14.
+
+"""
+
+import struct
+import time
+import zlib
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")  # local file header of an entry
+DATA_DESCRIPTOR = 0x08  # flag of the sizes written after the data
+WBITS = -15  # raw deflate stream, as zipfile writes it
+
+
+def read_raw(src: ZipFile, info: ZipInfo) -> bytes:
+    """Read the compressed bytes of an entry.
+
+    Parameters
+    ----------
+    src : ZipFile
+        Archive opened for reading.
+    info : ZipInfo
+        Entry of the archive.
+
+    Returns
+    -------
+    bytes
+        Compressed bytes of the entry.
+    """
+    fp = src.fp
+    fp.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(fp.read(LOCAL_HEADER.size))
+    name_size, extra_size = header[-2:]
+    fp.seek(info.header_offset + LOCAL_HEADER.size + name_size + extra_size)
+    return fp.read(info.compress_size)
+
+
+def write_raw(dst: ZipFile, info: ZipInfo, data: bytes) -> None:
+    """Write an entry from its compressed bytes.
+
+    Parameters
+    ----------
+    dst : ZipFile
+        Archive opened for writing.
+    info : ZipInfo
+        Entry to write, its compression, CRC and sizes describe the data.
+    data : bytes
+        Compressed bytes of the entry.
+    """
+    info.flag_bits &= ~DATA_DESCRIPTOR
+    with dst._lock:  # noqa: SLF001
+        if dst._seekable:  # noqa: SLF001
+            dst.fp.seek(dst.start_dir)
+        info.header_offset = dst.fp.tell()
+        dst._writecheck(info)  # noqa: SLF001
+        dst._didModify = True  # noqa: SLF001
+        dst.fp.write(info.FileHeader())
+        dst.fp.write(data)
+        dst.filelist.append(info)
+        dst.NameToInfo[info.filename] = info
+        dst.start_dir = dst.fp.tell()
+
+
+def copy_entry(
+    src: ZipFile,
+    info: ZipInfo,
+    dst: ZipFile,
+    comment: bytes | None = None,
+) -> None:
+    """Copy an entry to another archive without compressing it again.
+
+    Parameters
+    ----------
+    src : ZipFile
+        Archive opened for reading.
+    info : ZipInfo
+        Entry of the source archive.
+    dst : ZipFile
+        Archive opened for writing.
+    comment : bytes | None, optional
+        Comment of the new entry, by default the one of the source entry.
+    """
+    new = ZipInfo(info.filename, info.date_time)
+    new.compress_type = info.compress_type
+    new.CRC = info.CRC
+    new.compress_size = info.compress_size
+    new.file_size = info.file_size
+    new.external_attr = info.external_attr
+    new.create_system = info.create_system
+    new.flag_bits = info.flag_bits
+    new.comment = info.comment if comment is None else comment
+    write_raw(dst, new, read_raw(src, info))
+
+
+def write_bytes(  # noqa: PLR0913
+    dst: ZipFile,
+    arcname: str,
+    data: bytes,
+    old: ZipFile | None = None,
+    *,
+    comment: bytes = b"",
+    compress_type: int | None = None,
+) -> bool:
+    """Write data to an archive, copy it from the old archive if it is the same.
+
+    Parameters
+    ----------
+    dst : ZipFile
+        Archive opened for writing.
+    arcname : str
+        Name of the entry.
+    data : bytes
+        Content of the entry.
+    old : ZipFile | None, optional
+        Old version of the archive, by default None.
+    comment : bytes, optional
+        Comment of the entry, by default b"".
+    compress_type : int | None, optional
+        Compression of the entry, by default the one of the archive.
+
+    Returns
+    -------
+    bool
+        True if the entry is copied from the old archive.
+    """
+    compress_type = dst.compression if compress_type is None else compress_type
+    info = old.NameToInfo.get(arcname) if old is not None else None
+    if (
+        info is not None
+        and info.compress_type == compress_type
+        and info.file_size == len(data)
+        and zlib.crc32(data) == info.CRC
+    ):
+        copy_entry(old, info, dst, comment)
+        return True
+    info = ZipInfo(arcname, time.localtime()[:6])
+    info.compress_type = compress_type
+    info.external_attr = 0o644 << 16
+    info.comment = comment
+    dst.writestr(info, data, compresslevel=dst.compresslevel)
+    return False
+
+
+def deflate(data: bytes, level: int) -> tuple[int, int, bytes]:
+    """Compress data to a deflate stream of a zip entry.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of the entry.
+    level : int
+        Compression level, from 0 to 9.
+
+    Returns
+    -------
+    tuple[int, int, bytes]
+        CRC and size of the data, compressed bytes.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS)
+    return zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()
+
+
+def write_deflated(
+    dst: ZipFile,
+    arcname: str,
+    deflated: tuple[int, int, bytes],
+    comment: bytes = b"",
+) -> None:
+    """Write an entry compressed by :func:`deflate`.
+
+    Parameters
+    ----------
+    dst : ZipFile
+        Archive opened for writing.
+    arcname : str
+        Name of the entry.
+    deflated : tuple[int, int, bytes]
+        Result of :func:`deflate`.
+    comment : bytes, optional
+        Comment of the entry, by default b"".
+    """
+    crc, size, data = deflated
+    info = ZipInfo(arcname, time.localtime()[:6])
+    info.compress_type = ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    info.comment = comment
+    info.CRC = crc
+    info.file_size = size
+    info.compress_size = len(data)
+    write_raw(dst, info, data)
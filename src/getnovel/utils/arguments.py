@@ -2,9 +2,10 @@
 
 from pathlib import Path
 
-from getnovel.utils.crawler import NovelCrawler
+from getnovel.utils.crawler import BatchCrawler, NovelCrawler
 from getnovel.utils.epub import EpubMaker
 from getnovel.utils.file import FileCleaner, XhtmlFileConverter
+from getnovel.utils.store import pack_directory, unpack_directory
 
 
 def crawl_func(args: dict) -> None:
@@ -14,10 +15,42 @@ def crawl_func(args: dict) -> None:
         start=int(args.start),
         stop=int(args.stop),
         result=args.result,
+        resume=args.resume,
+        offline=args.offline,
+        pack=args.pack,
+        compress=args.compress,
     )
     if args.clean:
         cvt = FileCleaner(raw=p.result)
-        cvt.process(result=p.result.parent / "cleaned")
+        cvt.process(result=p.result.parent / "cleaned", jobs=args.jobs)
+
+
+def crawl_batch_func(args: dict) -> None:
+    """Run crawling process for all novels of a batch file."""
+    p = BatchCrawler(
+        max_novels=int(args.max_novels),
+        max_per_domain=int(args.max_per_domain),
+    )
+    p.crawl(
+        Path(args.batch),
+        resume=args.resume,
+        pack=args.pack,
+        compress=args.compress,
+    )
+    if args.clean:
+        for novel in p.novels:
+            cvt = FileCleaner(raw=novel.result)
+            cvt.process(result=novel.result.parent / "cleaned", jobs=args.jobs)
+
+
+def pack_func(args: dict) -> None:
+    """Move chapter files to a pack file."""
+    pack_directory(Path(args.raw).resolve(), compress=args.compress)
+
+
+def unpack_func(args: dict) -> None:
+    """Move chapters of a pack file to chapter files."""
+    unpack_directory(Path(args.raw).resolve())
 
 
 def dedup_func(args: dict) -> None:
@@ -27,19 +60,43 @@ def dedup_func(args: dict) -> None:
     if args.result:
         result = Path(args.result)
     cvt = FileCleaner(raw=raw)
-    cvt.process(result=result, dedup=True)
+    cvt.process(
+        result=result,
+        dedup=True,
+        identities=args.identities,
+        jobs=args.jobs,
+    )
 
 
 def convert_func(args: dict) -> None:
     """Convert process."""
     cvt = XhtmlFileConverter(raw=Path(args.raw))
-    cvt.process(result=args.result, lang_code=args.lang, dedup=args.dedup)
+    cvt.process(
+        result=args.result,
+        lang_code=args.lang,
+        dedup=args.dedup,
+        identities=args.identities,
+        jobs=args.jobs,
+        merge=args.merge,
+        merge_kb=args.merge_kb,
+    )
 
 
 def epub_from_raw_func(args: dict) -> None:
     """Make epub from raw process."""
     maker = EpubMaker(raw=Path(args.raw), lang_code=args.lang)
-    maker.process(result=args.result, dedup=args.dedup)
+    maker.process(
+        result=args.result,
+        dedup=args.dedup,
+        identities=args.identities,
+        jobs=args.jobs,
+        level=args.level,
+        volume_size=args.volume_size,
+        volume_mb=args.volume_mb,
+        merge=args.merge,
+        merge_kb=args.merge_kb,
+        toc_group=args.toc_group,
+    )
 
 
 def epub_from_url_func(args: dict) -> None:
@@ -52,4 +109,15 @@ def epub_from_url_func(args: dict) -> None:
     )
     result = Path(args.result) if args.result else Path.cwd()
     maker = EpubMaker(raw=p.result, lang_code=p.spider.lang_code)
-    maker.process(result=result, dedup=args.dedup)
+    maker.process(
+        result=result,
+        dedup=args.dedup,
+        identities=args.identities,
+        jobs=args.jobs,
+        level=args.level,
+        volume_size=args.volume_size,
+        volume_mb=args.volume_mb,
+        merge=args.merge,
+        merge_kb=args.merge_kb,
+        toc_group=args.toc_group,
+    )
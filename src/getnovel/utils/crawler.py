@@ -1,17 +1,21 @@
 """Define NovelCrawler class."""
 
+import csv
 import logging
 import sys
+from collections import Counter, deque
+from collections.abc import Iterator
 from pathlib import Path
 
 import tldextract
 from scrapy import Spider
-from scrapy.crawler import CrawlerProcess
+from scrapy.crawler import Crawler, CrawlerProcess
 from scrapy.settings import Settings
 from scrapy.spiderloader import SpiderLoader
 from slugify import slugify
 
 from getnovel.data import scrapy_settings
+from getnovel.utils.store import open_store
 
 _logger = logging.getLogger(__name__)
 
@@ -49,6 +53,54 @@ class NovelCrawler:
         options: dict
             result: Path | None
                 Path of result directory.
+            resume: bool
+                If specified, skip chapters that are already in the result
+                directory, so an interrupted crawl can be resumed.
+            offline: bool
+                If specified, read every page from the HTTP cache, pages
+                that are not in the cache are errors.
+            pack: bool
+                If specified, store the chapters in a single pack file
+                instead of one file per chapter.
+            compress: bool
+                If specified, store the chapters in a pack file compressed
+                with zstd.
+        """
+        start = self.prepare(start, stop, **options)
+        if start is None:
+            return
+        # start crawling
+        process = CrawlerProcess(self.settings)
+        t: logging.StreamHandler = logging.root.handlers[0]
+        t.setStream(sys.stdout)
+        t.setLevel(logging.INFO)
+        crawler = process.create_crawler(self.spider)
+        process.crawl(crawler, self.url, start, stop)
+        process.start()
+        self.finish(crawler)
+
+    def prepare(
+        self: "NovelCrawler",
+        start: int,
+        stop: int,
+        **options: dict,
+    ) -> int | None:
+        """Check the chapter range and resolve the settings of the crawl.
+
+        Parameters
+        ----------
+        start : int
+            Start crawling from this chapter.
+        stop : int
+            Stop crawling after this chapter, input -1 to get all chapters.
+        options: dict
+            Same as :meth:`crawl`.
+
+        Returns
+        -------
+        int | None
+            The chapter to start crawling from, None if there is nothing to
+            download.
 
         Raises
         ------
@@ -61,18 +113,36 @@ class NovelCrawler:
             msg = "Index of start index need to be greater than zero"
             raise CrawlNovelError(msg)
         if (start > stop) and (stop > -1):
-            msg = "Start chapter need to be lesser than stop chapter"
-            " if stop chapter is not -1."
+            msg = (
+                "Start chapter need to be lesser than stop chapter"
+                " if stop chapter is not -1."
+            )
             raise CrawlNovelError(msg)
         # resolve result directory
         self.__resolve_result(options.get("result"))
-        # start crawling
-        process = CrawlerProcess(self.settings)
-        t: logging.StreamHandler = logging.root.handlers[0]
-        t.setStream(sys.stdout)
-        t.setLevel(logging.INFO)
-        process.crawl(self.spider, self.url, start, stop)
-        process.start()
+        if options.get("offline"):
+            self.__resolve_offline()
+        if options.get("pack") or options.get("compress"):
+            self.settings["CHAPTER_STORE"] = "pack"
+        if options.get("compress"):
+            self.settings["CHAPTER_COMPRESS"] = True
+        if options.get("resume"):
+            start = self.__resolve_resume(start, stop)
+            if start is None:
+                _logger.info("All chapters are downloaded: %s", self.result)
+        return start
+
+    def finish(self: "NovelCrawler", crawler: Crawler) -> None:
+        """Clean up after the crawler is closed.
+
+        Parameters
+        ----------
+        crawler : Crawler
+            The crawler that downloaded the novel.
+        """
+        missing = crawler.stats.get_value("httpcache/ignore", 0)
+        if missing:
+            _logger.error("%s pages are not in the cache.", missing)
         _logger.info("Done crawling. View result at: %s", self.result)
 
     def __resolve_result(self: "NovelCrawler", result: Path | str | None) -> None:
@@ -93,6 +163,178 @@ class NovelCrawler:
         self.result.mkdir(parents=True, exist_ok=True)
         self.settings["RESULT"] = str(self.result)
 
+    def __resolve_offline(self: "NovelCrawler") -> None:
+        """Read every page from the HTTP cache, without network access."""
+        self.settings.update(
+            {
+                "HTTPCACHE_ENABLED": True,
+                "HTTPCACHE_IGNORE_MISSING": True,
+                "HTTPCACHE_POLICY": "scrapy.extensions.httpcache.DummyPolicy",
+                "DOWNLOAD_HANDLERS": {"http": None, "https": None},
+                "ROBOTSTXT_OBEY": False,
+                "DOWNLOAD_DELAY": 0,
+                "AUTOTHROTTLE_ENABLED": False,
+                "THROTTLE_ENABLED": False,
+                "CONCURRENT_REQUESTS": 64,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": 64,
+            },
+        )
+
+    def __resolve_resume(self: "NovelCrawler", start: int, stop: int) -> int | None:
+        """
+        Skip chapters that are already downloaded.
+
+        Parameters
+        ----------
+        start : int
+            Start crawling from this chapter.
+        stop : int
+            Stop crawling after this chapter, -1 to get all chapters.
+
+        Returns
+        -------
+        int | None
+            The first chapter that is not downloaded, None if all chapters
+            from start to stop are downloaded.
+        """
+        with open_store(self.result) as store:
+            done = set(store.chapters())
+        # spiders that follow links can only start from the first missing chapter
+        while start in done:
+            start += 1
+        if (start > stop) and (stop > -1):
+            return None
+        skip = sorted(i for i in done if i > start)
+        self.settings["SKIP_CHAPTERS"] = skip
+        _logger.info("Resume from chapter %s, skip %s chapters.", start, len(skip))
+        return start
+
+
+class BatchCrawler:
+    """Download many novels in a single process."""
+
+    def __init__(
+        self: "BatchCrawler",
+        max_novels: int,
+        max_per_domain: int,
+    ) -> None:
+        """Initialize BatchCrawler.
+
+        Parameters
+        ----------
+        max_novels : int
+            Number of novels that are crawled at the same time.
+        max_per_domain : int
+            Number of novels of the same website that are crawled at the
+            same time.
+        """
+        self.max_novels = max_novels
+        self.max_per_domain = max_per_domain
+        self.novels: list[NovelCrawler] = []  # Novels that are crawled
+        self.settings = scrapy_settings.get_settings()  # Process settings
+        # the process settings are merged into the settings of every novel
+        del self.settings["RESULT"]
+        del self.settings["CHAPTER_STORE"]
+        del self.settings["CHAPTER_COMPRESS"]
+        self.__queue: deque[tuple[NovelCrawler, int, int]] = deque()
+        self.__running: Counter[str] = Counter()  # Running novels per spider
+        self.__process: CrawlerProcess = None
+
+    def crawl(self: "BatchCrawler", batch: Path, **options: dict) -> None:
+        """Download all novels of the batch file.
+
+        Each line of the batch file is ``url[,start[,stop[,result]]]``,
+        blank lines and lines starting with ``#`` are ignored.
+
+        Parameters
+        ----------
+        batch : Path
+            Path of the batch file.
+        options: dict
+            resume: bool
+                Same as :meth:`NovelCrawler.crawl`.
+            pack: bool
+                Same as :meth:`NovelCrawler.crawl`.
+            compress: bool
+                Same as :meth:`NovelCrawler.crawl`.
+        """
+        for url, start, stop, result in read_batch(batch):
+            try:
+                novel = NovelCrawler(url=url)
+                first = novel.prepare(start, stop, result=result, **options)
+            except (KeyError, CrawlNovelError) as e:
+                _logger.error("Skip %s: %s", url, e)  # noqa: TRY400
+                continue
+            if first is None:
+                continue
+            novel.settings["LOG_FILE"] = self.settings["LOG_FILE"]
+            self.__queue.append((novel, first, stop))
+        self.__process = CrawlerProcess(self.settings)
+        t: logging.StreamHandler = logging.root.handlers[0]
+        t.setStream(sys.stdout)
+        t.setLevel(logging.INFO)
+        self.__schedule()
+        self.__process.start()
+        _logger.info("Done crawling %s novels.", len(self.novels))
+
+    def __schedule(self: "BatchCrawler") -> None:
+        """Start queued novels while the limits allow it."""
+        blocked: deque[tuple[NovelCrawler, int, int]] = deque()
+        while self.__queue and self.__running.total() < self.max_novels:
+            novel, start, stop = self.__queue.popleft()
+            name = novel.spider.name
+            if self.__running[name] >= self.max_per_domain:
+                blocked.append((novel, start, stop))
+                continue
+            self.__running[name] += 1
+            # the first crawler installs the reactor
+            crawler = Crawler(
+                novel.spider,
+                novel.settings,
+                init_reactor=not self.novels,
+            )
+            self.novels.append(novel)
+            d = self.__process.crawl(crawler, novel.url, start, stop)
+            d.addBoth(self.__finished, novel, crawler)
+        self.__queue.extendleft(reversed(blocked))
+
+    def __finished(
+        self: "BatchCrawler",
+        result: object,
+        novel: NovelCrawler,
+        crawler: Crawler,
+    ) -> object:
+        """Start the next novels after a novel is done."""
+        self.__running[novel.spider.name] -= 1
+        novel.finish(crawler)
+        self.__schedule()
+        return result
+
+
+def read_batch(batch: Path) -> Iterator[tuple[str, int, int, str | None]]:
+    """Read a batch file.
+
+    Parameters
+    ----------
+    batch : Path
+        Path of the batch file.
+
+    Yields
+    ------
+    tuple[str, int, int, str | None]
+        Url, start chapter, stop chapter and result directory of a novel.
+    """
+    with batch.open(encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            row = [v.strip() for v in row]  # noqa: PLW2901
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            url = row[0]
+            start = int(row[1]) if len(row) > 1 and row[1] else 1
+            stop = int(row[2]) if len(row) > 2 and row[2] else -1  # noqa: PLR2004
+            result = row[3] if len(row) > 3 and row[3] else None  # noqa: PLR2004
+            yield url, start, stop, result
+
 
 def get_spider(url: str) -> type[Spider]:
     """Get the spider object associated with the given URL.
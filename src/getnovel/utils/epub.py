@@ -1,22 +1,57 @@
-"""Make EPUB module."""
+"""Make EPUB module.
 
-import html
+The EPUB is streamed to the archive: the templates are rendered in memory,
+the chapters are converted from the chapter store and written one by one,
+and the table of contents is written line by line. Nothing is copied to an
+``epub`` directory and the memory does not grow with the chapters.
+
+The chapters are converted and deflated by the same worker processes, the
+archive only writes the compressed bytes.
+
+"""
+
+import io
 import logging
+import re
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from importlib.resources import files
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from shutil import copy, copytree, move
+from textwrap import indent
+from typing import TypeVar
 from uuid import uuid1
-from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, is_zipfile
 
 import pytz
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 from slugify import slugify
 
-from getnovel import data
-from getnovel.utils.file import XhtmlFileConverter
+from getnovel.utils.archive import copy_entry, deflate, write_bytes, write_deflated
+from getnovel.utils.file import (
+    IDENTITIES,
+    MANIFEST_VERSION,
+    FileHandler,
+    convert_foreword,
+    convert_merged,
+    document_name,
+    split_chapters,
+)
+from getnovel.utils.store import hash_text, open_store
+from getnovel.utils.template import TEMPLATE, escape, load_template
 
-TEMPLATE = Path(str(files(data).joinpath("template")))
+STATIC = (  # entries copied from the template as they are
+    "META-INF/container.xml",
+    "OEBPS/Styles/gng-chapter.css",
+    "OEBPS/Styles/sgc-nav.css",
+)
+TOC = ("OEBPS/Text/nav.xhtml", "OEBPS/content.opf", "OEBPS/ncx/toc.ncx")
+LEVELS = {"fast": 1, "max": 9}  # presets of the compression level
+VOLUME = b"getnovel volume "  # comment of the archive of a volume, then n/total
+T = TypeVar("T")
+Chapter = tuple[int, str, bytes, int]  # index, escaped title, hash, size of text
 
 logging.basicConfig(
     format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
@@ -26,28 +61,29 @@ _logger = logging.getLogger(__name__)
 
 
 class EpubMaker:
-    """Make epub from raw directory."""
+    """Make epub from raw directory.
+
+    A chapter entry keeps the hash of its raw text in its comment, the
+    chapters that did not change are copied from the old epub without
+    converting and compressing them again.
+    """
 
     def __init__(self: "EpubMaker", raw: Path, lang_code: str) -> None:
         """Assign raw directory.
 
-        Parameters  `
+        Parameters
         ----------
         raw : Path
             Raw directory.
+        lang_code : str
+            Language code of the novel.
         """
         self.raw = raw.resolve()
         self.raw_foreword = self.raw / "foreword.txt"
-        self.epub = self.raw.parent / "epub"  # Epub directory
-        self.epub_file: Path = Path()  # Epub file
-        self.oebps = self.epub / "OEBPS"  # OEBPS directory
-        self.text = self.oebps / "Text"  # Text directory
-        self.images = self.oebps / "Images"  # Images directory
-        self.cover = self.images / "cover.jpg"  # cover.jpg
-        self.xhtml_cover = self.text / "cover.xhtml"  # cover.xhtml
-        self.xhtml_nav = self.text / "nav.xhtml"  # nav.xhtml
-        self.opf_content = self.oebps / "content.opf"  # content.opf
-        self.ncx_toc = self.oebps / "ncx" / "toc.ncx"  # toc.ncx
+        self.raw_cover = self.raw / "cover.jpg"
+        self.epub_file: Path = Path()  # Directory of the epub file
+        self.merge: tuple[int | None, int | None] = (None, None)  # see process
+        self.toc_group = 0  # chapters of a group of the table of contents
         self.lang_code = lang_code  # Language code
 
     def process(self: "EpubMaker", **options: Path | str | bool | None) -> None:
@@ -60,56 +96,313 @@ class EpubMaker:
                 Path of result directory.
             dedup: bool
                 If specified, deduplicate chapter title.
+            identities : Iterable[str]
+                Words of a chapter title, by default IDENTITIES.
+            jobs: int
+                Number of worker processes of the conversion, by default 1.
+            level: int | str
+                Compression level from 0 to 9 or a preset of LEVELS, by
+                default "max".
+            volume_size: int
+                Max number of chapters of a volume, by default one epub.
+            volume_mb: float
+                Max size of the text of a volume in MB, by default one epub.
+            merge: int
+                Merge up to this number of chapters in a document, by default
+                one document per chapter.
+            merge_kb: float
+                Merge chapters up to this size of text in KB in a document, by
+                default one document per chapter.
+            toc_group: int
+                Group the chapters of the table of contents by this number,
+                by default a flat table of contents.
         """
         self.epub_file = self.raw.parent
+        self.merge = (
+            options.get("merge") or None,
+            int((options.get("merge_kb") or 0) * 1024) or None,
+        )
+        self.toc_group = options.get("toc_group") or 0
         if options.get("result"):
             self.epub_file = Path(options.get("result")).resolve()
-        cvt = XhtmlFileConverter(raw=self.raw)
-        cvt.process(dedup=options.get("dedup"), lang_code=self.lang_code)
-        self.epub.mkdir(parents=True, exist_ok=True)
-        self.__copy_to_epub(cvt.result)
-        self.__make_epub()
-
-    def __copy_to_epub(self: "EpubMaker", xhtml: Path) -> None:
-        copytree(TEMPLATE, self.epub, dirs_exist_ok=True)
-        (self.text / "c1.xhtml").unlink()
-        self.cover.unlink()
-        copytree(xhtml, self.text, dirs_exist_ok=True)
-        move(self.text / "cover.jpg", self.images)
-
-    def __make_epub(self: "EpubMaker") -> None:
-        fw_lines = self.raw_foreword.read_text(encoding="utf-8").splitlines()
-        novel_title = fw_lines[0]  # content.opf, toc.ncx, zip
-        novel_uuid = uuid1()  # content.opf, toc.ncx
-        publisher_name = "hacde"  # content.opf
-        cover_title = "Ảnh bìa"  # cover.xhtml, toc.ncx
-        nav_title = "Mục lục"  # nav.xhtml
-        foreword_title = "Lời tựa"  # nav.xhtml, toc.ncx
+        identities = None
+        if options.get("dedup"):
+            identities = tuple(options.get("identities") or IDENTITIES)
+        jobs = options.get("jobs") or 1
+        level = options.get("level") or "max"
+        level = LEVELS[level] if level in LEVELS else int(level)
+        novel_title = self.raw_foreword.read_text(encoding="utf-8").split("\n", 1)[0]
+        epub_title = slugify(
+            novel_title,
+            max_length=32,
+            word_boundary=True,
+            save_order=True,
+        )
+        chapters = self.__read_chapters(identities, level)
+        volumes = split_chapters(
+            chapters,
+            [chapter[3] for chapter in chapters],
+            options.get("volume_size") or None,
+            int((options.get("volume_mb") or 0) * 1024**2) or None,
+        )
+        self.__clean_volumes(epub_title, len(volumes) if len(volumes) > 1 else 0)
+        if len(volumes) == 1:
+            path = self.epub_file / f"{epub_title}.epub"
+            self.make(volumes[0], path, identities, jobs=jobs, level=level)
+        else:
+            digits = len(str(len(volumes)))
+            builds = [
+                partial(
+                    self.make,
+                    chapters,
+                    self.epub_file / f"{epub_title}-{n:0{digits}}.epub",
+                    identities,
+                    jobs=1,
+                    level=level,
+                    volume=(n, len(volumes)),
+                )
+                for n, chapters in enumerate(volumes, 1)
+            ]
+            _logger.info("Make %s volumes", len(volumes))
+            if jobs > 1:
+                with ProcessPoolExecutor(max_workers=min(jobs, len(builds))) as pool:
+                    for future in [pool.submit(build) for build in builds]:
+                        future.result()
+            else:
+                for build in builds:
+                    build()
+        _logger.info("Done making epub. View result at: %s", self.epub_file)
+
+    def make(  # noqa: PLR0913
+        self: "EpubMaker",
+        chapters: list[Chapter],
+        epub_path: Path,
+        identities: tuple[str, ...] | None,
+        *,
+        jobs: int,
+        level: int,
+        volume: tuple[int, int] | None = None,
+    ) -> None:
+        """Make an epub of some chapters.
+
+        Parameters
+        ----------
+        chapters : list[Chapter]
+            The chapters of the epub.
+        epub_path : Path
+            Path of the epub, the old epub is reused.
+        identities : tuple[str, ...] | None
+            Words of a chapter title, None to keep the titles.
+        jobs : int
+            Number of worker processes of the conversion.
+        level : int
+            Compression level.
+        volume : tuple[int, int] | None, optional
+            Number of the volume and number of volumes, by default None.
+        """
+        fw_text = self.raw_foreword.read_text(encoding="utf-8")
+        fw_lines = fw_text.splitlines()
+        now = datetime.now(pytz.UTC)
+        fields = {
+            "novel_title": fw_lines[0],  # content.opf, toc.ncx, zip
+            "author_name": fw_lines[1],  # content.opf
+            "novel_uuid": uuid1(),  # content.opf, toc.ncx
+            "publisher_name": "hacde",  # content.opf
+            "language_code": self.lang_code,
+            "cover_title": "Ảnh bìa",  # cover.xhtml, toc.ncx
+            "nav_title": "Mục lục",  # nav.xhtml
+            "foreword_title": "Lời tựa",  # nav.xhtml, toc.ncx
+            "date_created": now.strftime("%Y-%m-%d"),  # content.opf
+            "date_modified": now.strftime("%Y-%m-%dT%H:%M:%SZ"),  # content.opf
+        }
+        volume_title = "{} - Tập {}"
         if self.lang_code == "zh":
-            cover_title = "封面"
-            nav_title = "目录"
-            foreword_title = "前言"
-        # edit cover.xhtml
-        image = Image.open(self.cover)
-        ext = image.format.lower()
-        width, height = image.size
-        image.save(self.cover, ext)
-        image.close()
-        self.cover.rename(self.cover.with_suffix("." + ext))
-        self.xhtml_cover.write_text(
-            self.xhtml_cover.read_text(encoding="utf-8").format(
-                cover_title=cover_title,
-                width=width,
-                height=height,
-                ext=ext,
-            ),
-            encoding="utf-8",
+            fields["cover_title"] = "封面"
+            fields["nav_title"] = "目录"
+            fields["foreword_title"] = "前言"
+            volume_title = "{} 第{}卷"
+        label = None
+        if volume is not None:
+            fields["novel_title"] = volume_title.format(fw_lines[0], volume[0])
+            label = f"{volume[0]}/{volume[1]}"
+        tmp_path = epub_path.with_suffix(".tmp")
+        old = ZipFile(epub_path) if is_zipfile(epub_path) else None
+        with (
+            old or nullcontext(),
+            ZipFile(
+                tmp_path,
+                "w",
+                compression=ZIP_DEFLATED,
+                compresslevel=level,
+            ) as f_zip,
+        ):
+            # the mimetype goes first, uncompressed
+            write_bytes(
+                f_zip,
+                "mimetype",
+                (TEMPLATE / "mimetype").read_bytes(),
+                compress_type=ZIP_STORED,
+            )
+            for name in STATIC:
+                write_bytes(f_zip, name, (TEMPLATE / name).read_bytes(), old)
+            fields["ext"] = self.__write_cover(
+                f_zip,
+                old,
+                fields["cover_title"],
+                label,
+            )
+            write_bytes(
+                f_zip,
+                "OEBPS/Text/foreword.xhtml",
+                convert_foreword(fw_text, self.lang_code).encode("utf-8"),
+                old,
+            )
+            documents = [[chapter] for chapter in chapters]
+            if any(self.merge):
+                documents = split_chapters(
+                    chapters,
+                    [chapter[3] for chapter in chapters],
+                    *self.merge,
+                )
+            reused = self.__write_chapters(
+                f_zip,
+                old,
+                documents,
+                partial(convert_deflate, level=level),
+                identities=identities,
+                jobs=jobs,
+            )
+            self.__write_toc(f_zip, documents, fields)
+            if label is not None:
+                f_zip.comment = VOLUME + label.encode()
+        tmp_path.replace(epub_path)
+        _logger.info("Reused %s chapters of the old %s", reused, epub_path.name)
+
+    def __clean_volumes(self: "EpubMaker", epub_title: str, count: int) -> None:
+        """Fit the old volumes of the novel to the new number of volumes.
+
+        A volume past the count is deleted. A volume named with another
+        number of digits, like ``-1`` instead of ``-01``, is renamed so its
+        chapters are reused. Only the epubs made as volumes are touched.
+
+        Parameters
+        ----------
+        epub_title : str
+            Name of the epub without the volume number.
+        count : int
+            Number of volumes, 0 for a single epub.
+        """
+        digits = len(str(count))
+        pattern = re.compile(rf"{re.escape(epub_title)}-(\d+)\.epub")
+        for path in sorted(self.epub_file.glob(f"{epub_title}-*.epub")):
+            match = pattern.fullmatch(path.name)
+            if match is None or not is_volume(path):
+                continue
+            n = int(match[1])
+            target = self.epub_file / f"{epub_title}-{n:0{digits}}.epub"
+            if n > count:
+                _logger.info("Remove the old volume %s", path.name)
+                path.unlink()
+            elif path != target and not target.exists():
+                path.replace(target)
+
+    def __read_chapters(
+        self: "EpubMaker",
+        identities: tuple[str, ...] | None,
+        level: int,
+    ) -> list[Chapter]:
+        """Get the index, escaped title, hash and size of the chapters."""
+        prefix = f"{MANIFEST_VERSION}:{identities}:{level}:"  # same text, options
+        with open_store(self.raw) as store:
+            metadata = store.metadata()
+        return [
+            (
+                index,
+                escape(meta.title),
+                hash_text(prefix + meta.hash).encode(),
+                meta.size,
+            )
+            for index, meta in metadata.items()
+        ]
+
+    def __write_cover(
+        self: "EpubMaker",
+        f_zip: ZipFile,
+        old: ZipFile | None,
+        cover_title: str,
+        label: str | None,
+    ) -> str:
+        """Write the cover image and its page, return the image extension.
+
+        The label, the number of a volume, is drawn at the bottom of the
+        cover.
+        """
+        cover = self.raw_cover
+        if not cover.exists():
+            cover = TEMPLATE / "OEBPS" / "Images" / "cover.jpg"
+        with Image.open(cover) as image:
+            ext = image.format.lower()
+            width, height = image.size
+            buffer = io.BytesIO()
+            if label is None:
+                image.save(buffer, ext)
+            else:
+                draw_label(image.convert("RGB"), label).save(buffer, ext)
+        write_bytes(f_zip, f"OEBPS/Images/cover.{ext}", buffer.getvalue(), old)
+        page = load_template("OEBPS/Text/cover.xhtml").render(
+            cover_title=cover_title,
+            width=width,
+            height=height,
+            ext=ext,
         )
-        # edit nav.xhtml
-        nav_li_tag_list = []
-        opf_item_tag_list = []
-        opf_itemref_tag_list = []
-        navpoint_tag_list = []
+        write_bytes(f_zip, "OEBPS/Text/cover.xhtml", page.encode("utf-8"), old)
+        return ext
+
+    def __write_chapters(  # noqa: PLR0913
+        self: "EpubMaker",
+        f_zip: ZipFile,
+        old: ZipFile | None,
+        documents: list[list[Chapter]],
+        convert: Callable[
+            [list[tuple[int, str]], re.Pattern | None],
+            tuple[int, int, bytes],
+        ],
+        *,
+        identities: tuple[str, ...] | None,
+        jobs: int,
+    ) -> int:
+        """Write the documents of the chapters, return the number of reused chapters."""
+        entries = old.NameToInfo if old is not None else {}
+        changed = []
+        for document in documents:
+            info = entries.get(f"OEBPS/Text/{document_name(indexes(document))}")
+            if info is None or info.comment != document_key(document):
+                changed.append(indexes(document))
+        converted = FileHandler(self.raw).map_chapters(
+            convert,
+            identities,
+            jobs,
+            changed,
+        )
+        _logger.info("Convert %s/%s documents", len(changed), len(documents))
+        todo = {group[0] for group in changed}
+        for document in documents:
+            name = f"OEBPS/Text/{document_name(indexes(document))}"
+            if document[0][0] in todo:
+                _, deflated = next(converted)
+                write_deflated(f_zip, name, deflated, document_key(document))
+            else:
+                copy_entry(old, entries[name], f_zip)
+        converted.close()
+        return sum(map(len, documents)) - sum(map(len, changed))
+
+    def __write_toc(
+        self: "EpubMaker",
+        f_zip: ZipFile,
+        documents: list[list[Chapter]],
+        fields: dict,
+    ) -> None:
+        """Write nav.xhtml, content.opf and toc.ncx."""
         nav_li = '    <li><a href="{chapter_name}">{chapter_title}</a></li>'
         item_tag = (
             '<item id="{chapter_id}" '
@@ -124,89 +417,139 @@ class EpubMaker:
             '      <content src="../Text/{chapter_name}" />\n'
             "  </navPoint>"
         )
-        chapter_list = sorted(self.raw.glob("*[0-9].txt"), key=get_id)
-        for chapter in chapter_list:
-            title = chapter.read_text(encoding="utf-8").splitlines()[0]
-            title = html.escape(title)
-            name = chapter.with_suffix(".xhtml").name
-            chapter_id = f"ID{name}"
-            navpoint_tag_list.append(
-                navpoint.format(
-                    index=chapter.stem,
-                    chapter_title=title,
-                    chapter_name=name,
-                ),
-            )
-            opf_item_tag_list.append(
-                item_tag.format(chapter_name=name, chapter_id=chapter_id),
-            )
-            opf_itemref_tag_list.append(itemref.format(chapter_id=chapter_id))
-            nav_li_tag_list.append(
-                nav_li.format(chapter_name=name, chapter_title=title),
-            )
-        # write to nav.xhtml
-        self.xhtml_nav.write_text(
-            self.xhtml_nav.read_text(encoding="utf-8").format(
-                language_code=self.lang_code,
-                nav_title=nav_title,
-                foreword_title=foreword_title,
-                cover_title=cover_title,
-                nav_li_tag_list="\n".join(nav_li_tag_list),
+        names = [document_name(indexes(document)) for document in documents]
+        lists = {
+            "nav_li_tag_list": (
+                nav_li.format(chapter_name=href, chapter_title=title)
+                for _, title, href in targets(documents)
             ),
-            encoding="utf-8",
-        )
-        # write to content.opf
-        self.opf_content.write_text(
-            self.opf_content.read_text(encoding="utf-8").format(
-                novel_title=novel_title,
-                author_name=fw_lines[1],
-                language_code=self.lang_code,
-                publisher_name=publisher_name,
-                date_created=datetime.now(pytz.UTC).strftime("%Y-%m-%d"),
-                date_modified=datetime.now(pytz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
-                novel_uuid=novel_uuid,
-                ext=ext,
-                opf_item_tag_list="\n    ".join(opf_item_tag_list),
-                opf_itemref_tag_list="\n    ".join(opf_itemref_tag_list),
+            "opf_item_tag_list": (
+                item_tag.format(chapter_id=f"ID{name}", chapter_name=name)
+                for name in names
             ),
-            encoding="utf-8",
-        )
-        # write to toc.ncx
-        self.ncx_toc.write_text(
-            self.ncx_toc.read_text(encoding="utf-8").format(
-                novel_uuid=novel_uuid,
-                novel_title=novel_title,
-                foreword_title=foreword_title,
-                navpoint_tag_list="\n".join(navpoint_tag_list),
+            "opf_itemref_tag_list": (
+                itemref.format(chapter_id=f"ID{name}") for name in names
             ),
-            encoding="utf-8",
-        )
-        # zip files to epub
-        epub_title = slugify(
-            novel_title,
-            max_length=32,
-            word_boundary=True,
-            save_order=True,
-        )
-        with ZipFile(
-            self.epub_file / f"{epub_title}.epub",
-            "w",
-            compression=ZIP_DEFLATED,
-            compresslevel=9,
-        ) as f_zip:
-            mime_path = self.epub / "mimetype"
-            f_zip.write(
-                mime_path,
-                mime_path.relative_to(self.epub),
-                compress_type=ZIP_STORED,
+            "navpoint_tag_list": (
+                navpoint.format(index=i, chapter_title=title, chapter_name=href)
+                for i, title, href in targets(documents)
+            ),
+        }
+        fields["toc_depth"] = 1
+        if self.toc_group:
+            fields["toc_depth"] = 2
+            group_title = "Chương {}\u2013{}"  # en dash between the numbers
+            if self.lang_code == "zh":
+                group_title = "第{}\u2013{}章"
+            nav_group = (
+                '    <li><a href="{chapter_name}">{chapter_title}</a>\n'
+                "      <ol>\n"
+                "{nav_li_tag_list}\n"
+                "      </ol>\n"
+                "    </li>"
             )
-            mime_path.unlink()
-            for path in self.epub.rglob("*"):
-                f_zip.write(path, path.relative_to(self.epub))
-            copy(TEMPLATE / "mimetype", self.epub)
-        _logger.info("Done making epub. View result at: %s", self.epub_file)
+            navpoint_group = (
+                '  <navPoint id="navGroup{index}">\n'
+                "      <navLabel>\n"
+                "        <text>{chapter_title}</text>\n"
+                "      </navLabel>\n"
+                '      <content src="../Text/{chapter_name}" />\n'
+                "{navpoint_tag_list}\n"
+                "  </navPoint>"
+            )
+            lists["nav_li_tag_list"] = (
+                nav_group.format(
+                    chapter_name=group[0][2],
+                    chapter_title=group_title.format(group[0][0], group[-1][0]),
+                    nav_li_tag_list="\n".join(
+                        "    " + nav_li.format(chapter_name=href, chapter_title=title)
+                        for _, title, href in group
+                    ),
+                )
+                for group in batched(targets(documents), self.toc_group)
+            )
+            lists["navpoint_tag_list"] = (
+                navpoint_group.format(
+                    index=group[0][0],
+                    chapter_title=group_title.format(group[0][0], group[-1][0]),
+                    chapter_name=group[0][2],
+                    navpoint_tag_list="\n".join(
+                        indent(
+                            navpoint.format(
+                                index=i,
+                                chapter_title=title,
+                                chapter_name=href,
+                            ),
+                            "  ",
+                        )
+                        for i, title, href in group
+                    ),
+                )
+                for group in batched(targets(documents), self.toc_group)
+            )
+        separators = {"opf_item_tag_list": "\n    ", "opf_itemref_tag_list": "\n    "}
+        for name in TOC:
+            pieces = load_template(name).stream(fields, lists, separators)
+            with f_zip.open(name, "w") as f:
+                f.writelines(piece.encode("utf-8") for piece in pieces)
+
+
+def convert_deflate(
+    chapters: list[tuple[int, str]],
+    titles: re.Pattern | None,
+    level: int,
+) -> tuple[int, int, bytes]:
+    """Convert chapters to an XHTML document and compress it for the archive."""
+    return deflate(convert_merged(chapters, titles).encode("utf-8"), level)
+
+
+def indexes(document: list[Chapter]) -> list[int]:
+    """Get the index of the chapters of a document."""
+    return [chapter[0] for chapter in document]
+
+
+def document_key(document: list[Chapter]) -> bytes:
+    """Get the key of a document, the one of its chapter if it is alone."""
+    if len(document) == 1:
+        return document[0][2]
+    return hash_text(b"".join(chapter[2] for chapter in document).decode()).encode()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split items in lists of a size, the last one can be shorter."""
+    iterator = iter(items)
+    while group := list(islice(iterator, size)):
+        yield group
+
+
+def targets(documents: list[list[Chapter]]) -> Iterator[tuple[int, str, str]]:
+    """Get the index, the title and the link of every chapter."""
+    for document in documents:
+        name = document_name(indexes(document))
+        for index, title, _, _ in document:
+            yield index, title, f"{name}#c{index}" if len(document) > 1 else name
+
+
+def is_volume(path: Path) -> bool:
+    """Check if an epub was made as a volume of a novel."""
+    if not is_zipfile(path):
+        return False
+    with ZipFile(path) as f_zip:
+        return f_zip.comment.startswith(VOLUME)
 
 
-def get_id(path: Path) -> int:
-    """Get chapter id."""
-    return int(path.stem)
+def draw_label(image: Image.Image, label: str) -> Image.Image:
+    """Draw a label in a band at the bottom of an image."""
+    width, height = image.size
+    band = max(12, height // 10)
+    font = ImageFont.load_default(size=band * 2 // 3)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, height - band, width, height), fill="black")
+    draw.text(
+        (width // 2, height - band // 2),
+        label,
+        fill="white",
+        font=font,
+        anchor="mm",
+    )
+    return image
@@ -1,15 +1,34 @@
 """Define FileConverter class."""
-import html
+import json
 import logging
-from importlib.resources import files
+import re
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import TypeVar
 
-from getnovel import data
+from getnovel.utils.store import ChapterStore, PackStore, open_store
+from getnovel.utils.template import Template, escape, load_template
 
-TEMPLATE = Path(files(data).joinpath("template/OEBPS/Text"))
-CHAPTER = TEMPLATE / "c1.xhtml"
-FOREWORD = TEMPLATE / "foreword.xhtml"
-PA = ".,:"
+CHAPTER = "OEBPS/Text/c1.xhtml"  # template of a chapter
+MERGED = "OEBPS/Text/chapters.xhtml"  # template of merged chapters
+FOREWORD = "OEBPS/Text/foreword.xhtml"
+SECTION = Template(  # a chapter in merged chapters
+    '  <h1 id="c{index}">{chapter_title}</h1>\n\n  {chapter_p_tag_list}',
+)
+P_SEPARATOR = "</p>\n\n  <p>"  # between the <p> tags of the lines
+# the full width punctuation marks of Chinese text are intended below
+PA = ".,:;!?)]…。，、：；！？）」』”"  # noqa: RUF001, never start a line
+CONTINUE = ",，、"  # noqa: RUF001, a line that ends with it goes on
+CJK_START = "\u2e80"  # first character of the CJK blocks
+IDENTITIES = ("Chương", "章")  # words of a chapter title
+MIN_CHUNK = 16  # chapters sent to a worker at once
+MANIFEST = "manifest.json"  # hash of the text of the converted chapters
+MANIFEST_VERSION = 1  # bump when the output of a chapter changes
+MAX_CHUNK = 256
+T = TypeVar("T")  # result of a function mapped over the chapters
 
 logging.basicConfig(
     format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
@@ -19,7 +38,14 @@ _logger = logging.getLogger(__name__)
 
 
 class FileHandler:
-    """Handle files."""
+    """Handle files.
+
+    Chapters are independent, :meth:`map_chapters` shards them across a
+    process pool in chunks and gives the results back in chapter order.
+    :meth:`map_changed` only maps the chapters whose text changed since the
+    last run, a manifest in the result directory keeps the hash of the
+    text of every chapter.
+    """
 
     def __init__(self: "FileHandler", raw: Path) -> None:
         """Init path of raw directory.
@@ -58,6 +84,115 @@ class FileHandler:
             dest_cover = self.result / self.raw_cover.name
             dest_cover.write_bytes(self.raw_cover.read_bytes())
 
+    def map_chapters(
+        self: "FileHandler",
+        func: Callable[[str, re.Pattern | None], T],
+        identities: tuple[str, ...] | None,
+        jobs: int = 1,
+        indexes: list[int] | list[list[int]] | None = None,
+    ) -> Iterator[tuple[int | list[int], T]]:
+        """Apply a function to the text of every chapter.
+
+        Parameters
+        ----------
+        func : Callable[[str, re.Pattern | None], T]
+            Module level function of the text and the title pattern, or a
+            partial of one.
+        identities : tuple[str, ...] | None
+            Words of a chapter title, None to keep the titles.
+        jobs : int, optional
+            Number of worker processes, by default 1.
+        indexes : list[int] | list[list[int]] | None, optional
+            Chapters to map, by default all chapters. An item can be a list
+            of chapters, the function then gets a list of their index and
+            text.
+
+        Yields
+        ------
+        tuple[int | list[int], T]
+            Item of indexes and result of the function, in chapter order.
+        """
+        if indexes is None:
+            with open_store(self.raw) as store:
+                indexes = store.chapters()
+        size = max(MIN_CHUNK, min(MAX_CHUNK, len(indexes) // (max(1, jobs) * 4)))
+        chunks = [indexes[i : i + size] for i in range(0, len(indexes), size)]
+        if jobs > 1 and len(chunks) > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=min(jobs, len(chunks)),
+                initializer=_open_worker,
+                initargs=(self.raw,),
+            )
+            results = _map_bounded(pool, func, chunks, identities, jobs * 2)
+        else:
+            pool = open_store(self.raw)  # closed like the pool
+            results = (_run_chunk(func, c, identities, pool) for c in chunks)
+        done = 0
+        step = max(1, len(indexes) // 10)  # report every 10%
+        with pool:
+            for chunk, texts in zip(chunks, results, strict=True):
+                yield from zip(chunk, texts, strict=True)
+                if (done + len(chunk)) // step > done // step:
+                    _logger.info(
+                        "Processed %s/%s chapters",
+                        done + len(chunk),
+                        len(indexes),
+                    )
+                done += len(chunk)
+
+    def map_changed(
+        self: "FileHandler",
+        func: Callable[[str, re.Pattern | None], str],
+        identities: tuple[str, ...] | None,
+        jobs: int,
+        done: set[int],
+        delete: Callable[[int], None],
+    ) -> Iterator[tuple[int, str]]:
+        """Apply a function to the chapters that changed since the last run.
+
+        Parameters
+        ----------
+        func : Callable[[str, re.Pattern | None], str]
+            Same as :meth:`map_chapters`.
+        identities : tuple[str, ...] | None
+            Same as :meth:`map_chapters`.
+        jobs : int
+            Same as :meth:`map_chapters`.
+        done : set[int]
+            Chapters whose output exists.
+        delete : Callable[[int], None]
+            Delete the output of a chapter that is not in the raw directory
+            anymore.
+
+        Yields
+        ------
+        tuple[int, str]
+            Index of the chapter and result of the function, in chapter order.
+        """
+        path = self.result / MANIFEST
+        key = [MANIFEST_VERSION, func.__name__, list(identities or [])]
+        old: dict[str, str] = {}
+        if path.exists():
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            if manifest.get("key") == key:
+                old = manifest["chapters"]
+            else:
+                path.unlink()  # the outputs are made with other options
+        with open_store(self.raw) as store:
+            hashes = {str(i): m.hash for i, m in store.metadata().items()}
+        for index in old.keys() - hashes.keys():
+            delete(int(index))
+        changed = [
+            int(i) for i, h in hashes.items() if old.get(i) != h or int(i) not in done
+        ]
+        _logger.info("%s/%s chapters changed", len(changed), len(hashes))
+        # an interrupted run leaves the old hashes, the chapters run again
+        yield from self.map_chapters(func, identities, jobs, changed)
+        path.write_text(
+            json.dumps({"key": key, "chapters": hashes}),
+            encoding="utf-8",
+        )
+
 
 class FileCleaner(FileHandler):
     """Clean files."""
@@ -72,10 +207,17 @@ class FileCleaner(FileHandler):
                 Path of result directory.
             dedup : bool
                 If specified, deduplicate chapter title.
+            identities : Iterable[str]
+                Words of a chapter title, by default IDENTITIES.
+            jobs : int
+                Number of worker processes, by default 1.
         """
         super().process("cleaned", **options)
         self.__clean_foreword()
-        self.__clean_chapter(dedup=options.get("dedup"))
+        identities = None
+        if options.get("dedup"):
+            identities = tuple(options.get("identities") or IDENTITIES)
+        self.__clean_chapter(identities, options.get("jobs") or 1)
         _logger.info("Done cleaning. View result at: %s", self.result)
 
     def __clean_foreword(self: "FileCleaner") -> None:
@@ -88,18 +230,24 @@ class FileCleaner(FileHandler):
                 encoding="utf-8",
             )
 
-    def __clean_chapter(self: "FileCleaner", *, dedup: bool) -> None:
-        for chapter_path in self.raw.glob("*[0-9].txt"):
-            lines = chapter_path.read_text(encoding="utf-8").splitlines()
-            chapter = lines[:1]
-            content = lines[1:]
-            if dedup:
-                content = dedup_title(content)
-            chapter.extend(fix_bad_newline(content))
-            (self.result / chapter_path.name).write_text(
-                "\n".join(chapter),
-                encoding="utf-8",
-            )
+    def __clean_chapter(
+        self: "FileCleaner",
+        identities: tuple[str, ...] | None,
+        jobs: int,
+    ) -> None:
+        with open_store(self.raw) as raw:
+            kind = "pack" if isinstance(raw, PackStore) else "directory"
+            urls = {i: m.url for i, m in raw.metadata().items()}
+        with open_store(self.result, default=kind) as result:
+            done = set(result.chapters())
+            for index, text in self.map_changed(
+                clean_chapter,
+                identities,
+                jobs,
+                done,
+                result.delete,
+            ):
+                result.write(index, text, urls[index])
 
 
 class XhtmlFileConverter(FileHandler):
@@ -118,67 +266,353 @@ class XhtmlFileConverter(FileHandler):
                 Path of result directory.
             dedup : bool
                 If specified, deduplicate chapter title.
+            identities : Iterable[str]
+                Words of a chapter title, by default IDENTITIES.
             lang_code : str
                 Language code of the novel.
+            jobs : int
+                Number of worker processes, by default 1.
+            merge : int
+                Merge up to this number of chapters in a document, by
+                default one document per chapter.
+            merge_kb : float
+                Merge chapters up to this size of text in KB in a document,
+                by default one document per chapter.
         """
         super().process("converted", **options)
         self.__convert_foreword(options.get("lang_code"))
-        self.__convert_chapter(dedup=options.get("dedup"))
+        identities = None
+        if options.get("dedup"):
+            identities = tuple(options.get("identities") or IDENTITIES)
+        jobs = options.get("jobs") or 1
+        merge = options.get("merge") or None
+        merge_bytes = int((options.get("merge_kb") or 0) * 1024) or None
+        if merge or merge_bytes:
+            self.__convert_merged(identities, jobs, merge, merge_bytes)
+        else:
+            self.__convert_chapter(identities, jobs)
         _logger.info("Done converting. View result at: %s", self.result)
 
     def __convert_foreword(self: "XhtmlFileConverter", lang_code: str) -> None:
         if self.raw_foreword.exists():
-            lines = self.raw_foreword.read_text(encoding="utf-8").splitlines()
-            foreword = lines[:4]
-            foreword.extend(fix_bad_newline(lines[4:]))
-            foreword = [html.escape(line) for line in foreword]
-            p_tags = [f"<p>{line}</p>" for line in foreword[4:]]
-            foreword_title = "Lời tựa" if lang_code == "vi" else "内容简介"
             (self.result / "foreword.xhtml").write_text(
-                FOREWORD.read_text(encoding="utf-8").format(
-                    foreword_title=foreword_title,
-                    novel_title=foreword[0],
-                    author_name=foreword[1],
-                    types=foreword[2],
-                    url=foreword[3],
-                    foreword_p_tag_list="\n\n  ".join(p_tags),
+                convert_foreword(
+                    self.raw_foreword.read_text(encoding="utf-8"),
+                    lang_code,
                 ),
                 encoding="utf-8",
             )
 
-    def __convert_chapter(self: "XhtmlFileConverter", *, dedup: bool) -> None:
-        for chapter_path in self.raw.glob("*[0-9].txt"):
-            lines = chapter_path.read_text(encoding="utf-8").splitlines()
-            chapter = lines[:1]
-            content = lines[1:]
-            if dedup:
-                content = dedup_title(content)
-            chapter.extend(fix_bad_newline(content))
-            chapter = [html.escape(line) for line in chapter]
-            p_tags = [f"<p>{line}</p>" for line in chapter[1:]]
-            (self.result / chapter_path.with_suffix(".xhtml").name).write_text(
-                CHAPTER.read_text(encoding="utf-8").format(
-                    chapter_title=chapter[0],
-                    chapter_p_tag_list="\n\n  ".join(p_tags),
-                ),
-                encoding="utf-8",
-            )
+    def __convert_chapter(
+        self: "XhtmlFileConverter",
+        identities: tuple[str, ...] | None,
+        jobs: int,
+    ) -> None:
+        done = set()
+        for path in self.result.glob("*[0-9].xhtml"):
+            if path.stem.isdigit():
+                done.add(int(path.stem))
+            else:
+                path.unlink()  # merged chapters of the last run
+        for index, xhtml in self.map_changed(
+            convert_chapter,
+            identities,
+            jobs,
+            done,
+            lambda i: (self.result / f"{i}.xhtml").unlink(missing_ok=True),
+        ):
+            (self.result / f"{index}.xhtml").write_text(xhtml, encoding="utf-8")
+
+    def __convert_merged(
+        self: "XhtmlFileConverter",
+        identities: tuple[str, ...] | None,
+        jobs: int,
+        merge: int | None,
+        merge_bytes: int | None,
+    ) -> None:
+        """Convert the chapters to merged documents, all of them every time."""
+        with open_store(self.raw) as store:
+            metadata = store.metadata()
+        groups = split_chapters(
+            list(metadata),
+            [meta.size for meta in metadata.values()],
+            merge,
+            merge_bytes,
+        )
+        for path in self.result.glob("*[0-9].xhtml"):
+            path.unlink()
+        (self.result / MANIFEST).unlink(missing_ok=True)
+        _logger.info("Merge %s chapters in %s documents", len(metadata), len(groups))
+        for group, xhtml in self.map_chapters(convert_merged, identities, jobs, groups):
+            (self.result / document_name(group)).write_text(xhtml, encoding="utf-8")
+
+
+def clean_lines(text: str, titles: re.Pattern | None) -> list[str]:
+    """Tidy the lines of a chapter, the first line is the title.
+
+    Parameters
+    ----------
+    text : str
+        Text of the chapter.
+    titles : re.Pattern | None
+        Pattern of the words of a chapter title, None to keep the titles.
+
+    Returns
+    -------
+    list[str]
+        Title and fixed lines of the chapter.
+    """
+    lines = text.splitlines()
+    chapter = lines[:1]
+    content = iter(lines[1:])
+    if titles is not None and chapter:
+        content = iter_dedup_title(content, titles, chapter[0])
+    chapter.extend(fix_bad_newline(content))
+    return chapter
+
+
+def clean_chapter(text: str, titles: re.Pattern | None) -> str:
+    """Tidy the text of a chapter, see :func:`clean_lines`."""
+    return "\n".join(clean_lines(text, titles))
+
+
+def convert_chapter(text: str, titles: re.Pattern | None) -> str:
+    """Convert the text of a chapter to XHTML, see :func:`clean_lines`."""
+    return render_chapter(clean_lines(text, titles))
+
+
+def render_chapter(lines: list[str]) -> str:
+    """Render the title and the lines of a chapter to XHTML."""
+    return load_template(CHAPTER).render(
+        chapter_title=escape(lines[0]),
+        chapter_p_tag_list=p_tags(lines[1:]),
+    )
+
+
+def p_tags(lines: list[str]) -> str:
+    """Escape the lines in a single pass and wrap each one in a <p> tag."""
+    if not lines:
+        return ""
+    return "<p>" + escape("\n".join(lines)).replace("\n", P_SEPARATOR) + "</p>"
+
+
+def convert_merged(
+    chapters: list[tuple[int, str]],
+    titles: re.Pattern | None,
+) -> str:
+    """Convert chapters to a single XHTML document, see :func:`render_merged`.
+
+    A single chapter is converted by :func:`convert_chapter`.
+    """
+    if len(chapters) == 1:
+        return convert_chapter(chapters[0][1], titles)
+    return render_merged([(i, clean_lines(text, titles)) for i, text in chapters])
+
+
+def render_merged(chapters: list[tuple[int, list[str]]]) -> str:
+    """Render chapters to a single XHTML document.
+
+    Parameters
+    ----------
+    chapters : list[tuple[int, list[str]]]
+        Index, title and lines of every chapter.
+
+    Returns
+    -------
+    str
+        The document, the title of a chapter has the ``c{index}`` id.
+    """
+    sections = [
+        SECTION.render(
+            index=index,
+            chapter_title=escape(lines[0]),
+            chapter_p_tag_list=p_tags(lines[1:]),
+        )
+        for index, lines in chapters
+    ]
+    return load_template(MERGED).render(
+        chapter_title=escape(chapters[0][1][0]),
+        chapter_section_list="\n\n".join(sections),
+    )
+
+
+def document_name(indexes: list[int]) -> str:
+    """Get the file name of the XHTML document of some chapters."""
+    if len(indexes) == 1:
+        return f"{indexes[0]}.xhtml"
+    return f"{indexes[0]}-{indexes[-1]}.xhtml"
 
 
-def fix_bad_newline(lines: list[str]) -> list[str]:
+def split_chapters(
+    items: list[T],
+    sizes: list[int],
+    max_chapters: int | None = None,
+    max_bytes: int | None = None,
+) -> list[list[T]]:
+    """Split chapters in consecutive groups.
+
+    Parameters
+    ----------
+    items : list[T]
+        The chapters, in order.
+    sizes : list[int]
+        Size of the text of every chapter.
+    max_chapters : int | None, optional
+        Max number of chapters of a group, by default no limit.
+    max_bytes : int | None, optional
+        Max size of the text of a group, by default no limit. A chapter
+        bigger than it makes a group alone.
+
+    Returns
+    -------
+    list[list[T]]
+        The groups, a single one without limits.
+    """
+    groups: list[list[T]] = [[]]
+    total = 0
+    for item, size in zip(items, sizes, strict=True):
+        group = groups[-1]
+        if group and (
+            (max_chapters and len(group) >= max_chapters)
+            or (max_bytes and total + size > max_bytes)
+        ):
+            groups.append([])
+            total = 0
+        groups[-1].append(item)
+        total += size
+    return groups
+
+
+def convert_foreword(text: str, lang_code: str) -> str:
+    """Convert the foreword to XHTML.
+
+    Parameters
+    ----------
+    text : str
+        Text of the foreword: title, author, types, url then the foreword.
+    lang_code : str
+        Language code of the novel.
+
+    Returns
+    -------
+    str
+        The XHTML document.
+    """
+    lines = text.splitlines()
+    foreword = lines[:4]
+    foreword.extend(fix_bad_newline(lines[4:]))
+    foreword_title = "Lời tựa" if lang_code == "vi" else "内容简介"
+    return load_template(FOREWORD).render(
+        foreword_title=foreword_title,
+        novel_title=escape(foreword[0]),
+        author_name=escape(foreword[1]),
+        types=escape(foreword[2]),
+        url=escape(foreword[3]),
+        foreword_p_tag_list=p_tags(foreword[4:]),
+    )
+
+
+_WORKER: dict[str, ChapterStore] = {}  # chapter store of the worker process
+
+
+def _open_worker(raw: Path) -> None:
+    """Open the chapter store of a worker."""
+    if "store" in _WORKER:
+        _WORKER["store"].close()
+    _WORKER["store"] = open_store(raw)
+
+
+def _map_bounded(
+    pool: ProcessPoolExecutor,
+    func: Callable[[str, re.Pattern | None], T],
+    chunks: list[list[int]],
+    identities: tuple[str, ...] | None,
+    window: int,
+) -> Iterator[list[T]]:
+    """Map the chunks in order, with at most window chunks in flight."""
+    pending: deque[Future] = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(_run_chunk, func, chunk, identities))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _run_chunk(
+    func: Callable[[str, re.Pattern | None], T],
+    indexes: list[int] | list[list[int]],
+    identities: tuple[str, ...] | None,
+    store: ChapterStore | None = None,
+) -> list[T]:
+    """Apply a function to a chunk of chapters, in a worker by default."""
+    titles = compile_titles(identities) if identities else None
+    store = store or _WORKER["store"]
+    return [func(_read(store, index), titles) for index in indexes]
+
+
+def _read(store: ChapterStore, item: int | list[int]) -> str | list[tuple[int, str]]:
+    """Read a chapter, or the index and the text of a list of chapters."""
+    if isinstance(item, int):
+        return store.read(item)
+    return [(index, store.read(index)) for index in item]
+
+
+def iter_fixed_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Tidy the lines in a single pass.
+
+    Blank lines are dropped. A line is joined to the previous one when the
+    previous one ends with a comma or a lower case letter, or when it starts
+    with a lower case letter. A line that starts with a punctuation mark is
+    glued to the previous one. Chinese text is joined without space.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Input lines.
+
+    Yields
+    ------
+    str
+        Fixed lines.
+    """
+    parts: list[str] = []  # fragments of the current line, joined once
+    last = ""  # last character of the current line
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        first = line[0]
+        if not parts or first in PA:
+            parts.append(line)
+        elif last in CONTINUE or last.islower() or first.islower():
+            # most text is latin, skip the calls
+            latin = last < CJK_START and first < CJK_START
+            if latin or not (is_cjk(last) or is_cjk(first)):
+                parts.append(" ")
+            parts.append(line)
+        else:
+            yield "".join(parts)
+            parts = [line]
+        last = line[-1]
+    if parts:
+        yield "".join(parts)
+
+
+def fix_bad_newline(lines: Iterable[str]) -> list[str]:
     """Tidy the result.
 
     Filtered blank lines. Concatenate lines that
-    likely to be in the same setence.
+    likely to be in the same setence, see :func:`iter_fixed_lines`.
 
     Examples
     --------
     >>> fix_bad_newline(["A and", "b"])
-    >>> ["A and b"]
+    ['A and b']
 
     Parameters
     ----------
-    lines : list[str]
+    lines : Iterable[str]
         Input lines.
 
     Returns
@@ -186,26 +620,81 @@ def fix_bad_newline(lines: list[str]) -> list[str]:
     list[str]
         Fixed lines.
     """
-    lines = lines.copy()
-    s_lines: list[str] = [line.strip() for line in lines if line.strip()]
-    result: list[str] = []
-    result.append(s_lines[0])
-    for line in s_lines[1:]:
-        last = result[-1][-1]
-        first = line[0]
-        if last == "," or last.islower() or first.islower():
-            result[-1] += " " + line
-        elif first in PA:
-            result += line
-        else:
-            result.append(line)
-    return result
+    return list(iter_fixed_lines(lines))
+
+
+def is_cjk(char: str) -> bool:
+    """Check if a character is Chinese or Japanese, or a full width form."""
+    return CJK_START <= char <= "\u9fff" or "\uf900" <= char <= "\uffef"
+
+
+@lru_cache
+def compile_titles(identities: Iterable[str]) -> re.Pattern:
+    """Compile the words of a chapter title to a single pattern.
+
+    Parameters
+    ----------
+    identities : Iterable[str]
+        Words of a chapter title, such as "Chương" or "章".
+
+    Returns
+    -------
+    re.Pattern
+        Pattern that finds any of the words, the longest first.
+
+    Raises
+    ------
+    ValueError
+        No word is given, the empty pattern would match every line.
+    """
+    words = sorted({w for w in identities if w}, key=len, reverse=True)
+    if not words:
+        msg = "Need at least one word of a chapter title"
+        raise ValueError(msg)
+    return re.compile("|".join(re.escape(w) for w in words))
+
+
+def iter_dedup_title(
+    lines: Iterable[str],
+    titles: re.Pattern,
+    title: str = "",
+    max_length: int = 100,
+) -> Iterator[str]:
+    """Drop the lines that repeat the chapter title, in a single pass.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Input lines.
+    titles : re.Pattern
+        Pattern of the words of a chapter title, see :func:`compile_titles`.
+    title : str, optional
+        Title of the chapter, the lines that are the same are dropped too,
+        by default "".
+    max_length : int, optional
+        Max length of chapter title, by default 100
+
+    Yields
+    ------
+    str
+        Lines that are not chapter titles.
+    """
+    title = "".join(title.split()).lower()  # spaces and case do not count
+    shortest = len(title) or max_length  # spaces only make a line longer
+    for line in lines:
+        if len(line) >= max_length:
+            yield line
+        elif titles.search(line):
+            continue
+        elif len(line) < shortest or line.replace(" ", "").lower() != title:
+            yield line
 
 
 def dedup_title(
     lines: list[str],
-    identities: set = ("Chương", "章"),
+    identities: Iterable[str] = IDENTITIES,
     max_length: int = 100,
+    title: str = "",
 ) -> list[str]:
     """Deduplicate chapter title.
 
@@ -213,19 +702,17 @@ def dedup_title(
     ----------
     lines : list[str]
         Input lines.
-    identities : set, optional
-        Identify key, by default ("Chương", "章")
+    identities : Iterable[str], optional
+        Identify key, by default IDENTITIES
     max_length : int, optional
         Max length of chapter title, by default 100
+    title : str, optional
+        Title of the chapter, by default "".
 
     Returns
     -------
     list[str]
         Deduplicated chapter title.
     """
-    lines = lines.copy()
-    for index, line in enumerate(lines):
-        for k in identities:
-            if k in line and len(line) < max_length:
-                del lines[index]
-    return lines
+    titles = compile_titles(tuple(identities))
+    return list(iter_dedup_title(lines, titles, title, max_length))
@@ -0,0 +1,630 @@
+"""Store the chapters of a raw directory.
+
+The chapters are either one ``{index}.txt`` file each
+(:class:`DirectoryStore`), or records appended to a single
+``chapters.pack`` file with an offset index in ``chapters.idx``
+(:class:`PackStore`). A record is a header (chapter index, length of the
+payload, flags) followed by the UTF-8 text, the last record of a chapter
+wins. Readers map the pack in memory.
+
+Records of a compressed pack are zstd frames. The first chapters of a novel
+train a dictionary, saved in ``chapters.dict``, that compresses the next
+chapters: chapters of a novel share names, phrases and site footers, which
+plain zstd can not find in a single chapter. Compression needs
+``compression.zstd`` (Python 3.14) or ``backports.zstd``.
+
+Both stores keep the title, the size in bytes, the hash and the source URL
+of every chapter in ``chapters.json``, updated by the writes and saved when
+the store is closed. :meth:`ChapterStore.metadata` reads it instead of every
+chapter, only the chapters it does not describe are read again. A pack also
+keeps the offset of the record, a chapter written again after the last save
+is found even if the store was never closed.
+
+The foreword and the cover stay in ``foreword.txt`` and ``cover.jpg``.
+
+"""
+
+import abc
+import hashlib
+import json
+import logging
+import mmap
+import struct
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple, Self
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+_logger = logging.getLogger(__name__)
+
+PACK = "chapters.pack"
+INDEX = "chapters.idx"
+DICT = "chapters.dict"
+META = "chapters.json"
+META_VERSION = 2  # bump when the fields of the metadata change
+HEADER = struct.Struct("<IIB")  # chapter index, payload length, flags
+ENTRY = struct.Struct("<IQ")  # chapter index, offset of the record
+PLAIN = 0  # flags of a record: UTF-8 text
+ZSTD = 1  # zstd frame
+ZSTD_DICT = 2  # zstd frame made with the dictionary of the pack
+DELETED = 255  # empty record of a deleted chapter
+DICT_SIZE = 112640  # default size of the zstd trainer
+
+
+class ChapterMeta(NamedTuple):
+    """Metadata of a chapter."""
+
+    title: str  # first line of the text
+    size: int  # size of the UTF-8 text in bytes
+    hash: str  # hash_text of the text
+    url: str | None = None  # page of the chapter
+    offset: int | None = None  # offset of the record in a pack
+
+
+class ChapterStore(abc.ABC):
+    """Base class of the chapter stores.
+
+    Subclasses call :meth:`update_meta` in :meth:`write` and
+    :meth:`delete_meta` in :meth:`delete`.
+    """
+
+    def __init__(self: "ChapterStore", raw: Path) -> None:
+        """Open the store of a raw directory.
+
+        Parameters
+        ----------
+        raw : Path
+            Path of raw directory.
+        """
+        self.raw = raw
+        self.meta_path = raw / META
+        self.__meta: dict[int, ChapterMeta] | None = None  # loaded on first use
+        self.__meta_changed = False
+
+    def __enter__(self: "ChapterStore") -> Self:
+        """Use the store as a context manager."""
+        return self
+
+    def __exit__(
+        self: "ChapterStore",
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the store."""
+        self.close()
+
+    @abc.abstractmethod
+    def chapters(self: "ChapterStore") -> list[int]:
+        """Get the index of the stored chapters, in ascending order."""
+
+    @abc.abstractmethod
+    def read(self: "ChapterStore", index: int) -> str:
+        """Read the text of a chapter.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+
+        Returns
+        -------
+        str
+            Text of the chapter, the first line is the title.
+        """
+
+    @abc.abstractmethod
+    def write(
+        self: "ChapterStore",
+        index: int,
+        text: str,
+        url: str | None = None,
+    ) -> None:
+        """Write the text of a chapter, replace the old one.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+        text : str
+            Text of the chapter, the first line is the title.
+        url : str | None, optional
+            Page of the chapter, by default the one of the old text.
+        """
+
+    @abc.abstractmethod
+    def delete(self: "ChapterStore", index: int) -> None:
+        """Delete a chapter if it is stored.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+        """
+
+    def close(self: "ChapterStore") -> None:
+        """Release the files of the store."""
+        self.save_meta()
+
+    def metadata(self: "ChapterStore") -> dict[int, ChapterMeta]:
+        """Get the metadata of the stored chapters, in ascending order.
+
+        Returns
+        -------
+        dict[int, ChapterMeta]
+            Metadata of every chapter, the chapters that are not described
+            or are stale are read again.
+        """
+        meta = self.__load_meta()
+        indexes = self.chapters()
+        stale = set(self.stale_meta(meta, indexes))
+        for index in stale:
+            old = meta.get(index)
+            self.update_meta(index, self.read(index), old.url if old else None)
+        for index in meta.keys() - set(indexes):
+            self.delete_meta(index)
+        if stale:
+            _logger.info("Indexed %s chapters of %s", len(stale), self.raw)
+        return {index: meta[index] for index in indexes}
+
+    def stale_meta(
+        self: "ChapterStore",
+        meta: dict[int, ChapterMeta],
+        indexes: list[int],
+    ) -> list[int]:
+        """Get the chapters whose metadata is missing or out of date."""
+        return [index for index in indexes if index not in meta]
+
+    def update_meta(
+        self: "ChapterStore",
+        index: int,
+        text: str,
+        url: str | None = None,
+        size: int | None = None,
+    ) -> None:
+        """Describe the new text of a chapter.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+        text : str
+            Text of the chapter.
+        url : str | None, optional
+            Page of the chapter, by default the one of the old text.
+        size : int | None, optional
+            Size of the encoded text if it is known, by default None.
+        """
+        meta = self.__load_meta()
+        if url is None and index in meta:
+            url = meta[index].url
+        if size is None:
+            size = len(text.encode("utf-8"))
+        meta[index] = ChapterMeta(
+            text.split("\n", 1)[0],
+            size,
+            hash_text(text),
+            url,
+            self.meta_offset(index),
+        )
+        self.__meta_changed = True
+
+    def meta_offset(self: "ChapterStore", index: int) -> int | None:
+        """Get the offset of the record of a chapter, None out of a pack."""
+        _ = index
+
+    def delete_meta(self: "ChapterStore", index: int) -> None:
+        """Forget the metadata of a deleted chapter."""
+        if self.__load_meta().pop(index, None) is not None:
+            self.__meta_changed = True
+
+    def save_meta(self: "ChapterStore") -> None:
+        """Save the metadata if it changed."""
+        if not self.__meta_changed:
+            return
+        chapters = {str(i): m._asdict() for i, m in sorted(self.__meta.items())}
+        tmp = self.meta_path.with_name(f"{META}.tmp")
+        tmp.write_text(
+            json.dumps(
+                {"version": META_VERSION, "chapters": chapters},
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        tmp.replace(self.meta_path)  # the metadata is never half written
+        self.__meta_changed = False
+
+    def __load_meta(self: "ChapterStore") -> dict[int, ChapterMeta]:
+        """Read the metadata file once."""
+        if self.__meta is None:
+            self.__meta = {}
+            if self.meta_path.exists():
+                data = json.loads(self.meta_path.read_text(encoding="utf-8"))
+                if data.get("version") == META_VERSION:
+                    self.__meta = {
+                        int(i): ChapterMeta(**m) for i, m in data["chapters"].items()
+                    }
+        return self.__meta
+
+
+class DirectoryStore(ChapterStore):
+    """One ``{index}.txt`` file per chapter."""
+
+    def chapters(self: "DirectoryStore") -> list[int]:
+        """Get the index of the stored chapters, in ascending order."""
+        return sorted(int(p.stem) for p in self.raw.glob("*[0-9].txt"))
+
+    def read(self: "DirectoryStore", index: int) -> str:
+        """Read the text of a chapter."""
+        return (self.raw / f"{index}.txt").read_text(encoding="utf-8")
+
+    def write(
+        self: "DirectoryStore",
+        index: int,
+        text: str,
+        url: str | None = None,
+    ) -> None:
+        """Write the text of a chapter, replace the old one."""
+        (self.raw / f"{index}.txt").write_text(text, encoding="utf-8")
+        self.update_meta(index, text, url)
+
+    def delete(self: "DirectoryStore", index: int) -> None:
+        """Delete a chapter if it is stored."""
+        (self.raw / f"{index}.txt").unlink(missing_ok=True)
+        self.delete_meta(index)
+
+    def stale_meta(
+        self: "DirectoryStore",
+        meta: dict[int, ChapterMeta],
+        indexes: list[int],
+    ) -> list[int]:
+        """Get the chapters that are not described or edited since."""
+        saved = self.meta_path.stat().st_mtime_ns if self.meta_path.exists() else 0
+        stale = []
+        for index in indexes:
+            stat = (self.raw / f"{index}.txt").stat()
+            if (
+                index not in meta
+                or stat.st_mtime_ns > saved
+                or stat.st_size != meta[index].size
+            ):
+                stale.append(index)
+        return stale
+
+
+class PackStore(ChapterStore):
+    """All chapters in an append-only pack file with an offset index."""
+
+    def __init__(
+        self: "PackStore",
+        raw: Path,
+        *,
+        compress: bool = False,
+        samples: int = 32,
+    ) -> None:
+        """Open the pack of a raw directory, create it if needed.
+
+        Parameters
+        ----------
+        raw : Path
+            Path of raw directory.
+        compress : bool, optional
+            If specified, compress the written chapters, by default False.
+        samples : int, optional
+            Number of chapters that train the dictionary, by default 32.
+        """
+        super().__init__(raw)
+        self.pack = raw / PACK
+        self.index = raw / INDEX
+        self.offsets: dict[int, int] = {}  # offset of the record of each chapter
+        self.pack.touch()
+        self.__load()
+        self.__map: mmap.mmap | None = None
+        self.__pack_file = None  # opened on the first write
+        self.__index_file = None
+        if compress and zstd is None:
+            _logger.warning("Install backports.zstd to compress the chapters.")
+        self.compress = compress and zstd is not None
+        self.samples = samples
+        self.__dict = None  # loaded on the first use
+        self.__compressors: dict[int, zstd.ZstdCompressor] = {}
+        self.__samples: list[bytes] = []  # chapters that train the dictionary
+
+    def chapters(self: "PackStore") -> list[int]:
+        """Get the index of the stored chapters, in ascending order."""
+        return sorted(self.offsets)
+
+    def read(self: "PackStore", index: int) -> str:
+        """Read the text of a chapter."""
+        payload, flags = self.read_record(index)
+        if flags == PLAIN:
+            return payload.decode("utf-8")
+        if zstd is None:
+            msg = "Install backports.zstd to read compressed chapters."
+            raise ImportError(msg)
+        if flags == ZSTD:
+            return zstd.decompress(payload).decode("utf-8")
+        return zstd.decompress(payload, zstd_dict=self.__load_dict()).decode("utf-8")
+
+    def read_record(self: "PackStore", index: int) -> tuple[bytes, int]:
+        """Read the payload and the flags of a chapter.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+
+        Returns
+        -------
+        tuple[bytes, int]
+            Payload and flags of the record.
+
+        Raises
+        ------
+        KeyError
+            The chapter is not stored.
+        """
+        offset = self.offsets[index]
+        mm = self.__mapped(offset + HEADER.size)
+        _, size, flags = HEADER.unpack_from(mm, offset)
+        start = offset + HEADER.size
+        mm = self.__mapped(start + size)
+        return mm[start : start + size], flags
+
+    def write(
+        self: "PackStore",
+        index: int,
+        text: str,
+        url: str | None = None,
+    ) -> None:
+        """Append the text of a chapter, replace the old one."""
+        data = text.encode("utf-8")
+        if not self.compress:
+            self.write_record(index, data, PLAIN)
+            self.update_meta(index, text, url, len(data))
+            return
+        flags = ZSTD_DICT if self.__load_dict() is not None else ZSTD
+        if flags == ZSTD and self.samples:
+            self.__samples.append(data)
+        frame = self.__compressor(flags).compress(
+            data,
+            mode=zstd.ZstdCompressor.FLUSH_FRAME,
+        )
+        self.write_record(index, frame, flags)
+        self.update_meta(index, text, url, len(data))
+        if len(self.__samples) >= self.samples > 0:
+            self.__train()
+
+    def delete(self: "PackStore", index: int) -> None:
+        """Append a deleted record, the chapter is not stored anymore."""
+        if index in self.offsets:
+            self.write_record(index, b"", DELETED)
+        self.delete_meta(index)
+
+    def stale_meta(
+        self: "PackStore",
+        meta: dict[int, ChapterMeta],
+        indexes: list[int],
+    ) -> list[int]:
+        """Get the chapters that are not described or written again since."""
+        return [
+            index
+            for index in indexes
+            if index not in meta or meta[index].offset != self.offsets[index]
+        ]
+
+    def meta_offset(self: "PackStore", index: int) -> int | None:
+        """Get the offset of the record of a chapter."""
+        return self.offsets.get(index)
+
+    def write_record(self: "PackStore", index: int, payload: bytes, flags: int) -> None:
+        """Append a record.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chapter.
+        payload : bytes
+            Content of the record.
+        flags : int
+            How the payload is encoded.
+        """
+        if self.__pack_file is None:
+            self.__pack_file = self.pack.open("ab")
+            self.__index_file = self.index.open("ab")
+        offset = self.__pack_file.seek(0, 2)
+        self.__pack_file.write(HEADER.pack(index, len(payload), flags) + payload)
+        self.__pack_file.flush()
+        self.__index_file.write(ENTRY.pack(index, offset))
+        self.__index_file.flush()  # the index never points to unwritten bytes
+        self.offsets[index] = offset
+        if flags == DELETED:
+            del self.offsets[index]
+
+    def close(self: "PackStore") -> None:
+        """Release the files of the store."""
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        for f in (self.__pack_file, self.__index_file):
+            if f is not None:
+                f.close()
+        self.__pack_file = self.__index_file = None
+        super().close()
+
+    def __compressor(self: "PackStore", flags: int) -> "zstd.ZstdCompressor":
+        """Get the compressor of the flags, it is reused for every chapter."""
+        if flags not in self.__compressors:
+            self.__compressors[flags] = zstd.ZstdCompressor(
+                zstd_dict=self.__load_dict() if flags == ZSTD_DICT else None,
+            )
+        return self.__compressors[flags]
+
+    def __load_dict(self: "PackStore") -> "zstd.ZstdDict | None":
+        """Get the dictionary of the pack, None if it is not trained yet."""
+        path = self.raw / DICT
+        if self.__dict is None and path.exists():
+            self.__dict = zstd.ZstdDict(path.read_bytes())
+        return self.__dict
+
+    def __train(self: "PackStore") -> None:
+        """Train the dictionary of the pack with the sample chapters."""
+        samples, self.__samples, self.samples = self.__samples, [], 0
+        try:
+            zdict = zstd.train_dict(samples, DICT_SIZE)
+        except zstd.ZstdError as e:
+            _logger.warning("Can not train the dictionary of %s: %s", self.pack, e)
+            return
+        path = self.raw / DICT
+        path.with_suffix(".tmp").write_bytes(zdict.dict_content)
+        path.with_suffix(".tmp").replace(path)  # a dictionary is never half written
+        self.__dict = zdict
+        _logger.info("Trained the dictionary of %s", self.pack)
+
+    def __mapped(self: "PackStore", end: int) -> mmap.mmap:
+        """Map the pack in memory, again if it grew past the mapped end."""
+        if self.__map is None or len(self.__map) < end:
+            if self.__map is not None:
+                self.__map.close()
+            with self.pack.open("rb") as f:
+                self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.__map
+
+    def __load(self: "PackStore") -> None:
+        """Read the index, rebuild it from the pack if it is broken."""
+        size = self.pack.stat().st_size
+        data = self.index.read_bytes() if self.index.exists() else b""
+        usable = len(data) - len(data) % ENTRY.size
+        for index, offset in ENTRY.iter_unpack(data[:usable]):
+            self.offsets[index] = offset
+        last = max(self.offsets.values(), default=-1)
+        if usable != len(data) or last >= size or (size and last < 0):
+            _logger.warning("Rebuild the index of %s", self.pack)
+            self.__rebuild(size)
+        else:
+            self.__drop_deleted()
+
+    def __rebuild(self: "PackStore", size: int) -> None:
+        """Scan the records of the pack to rebuild the index."""
+        self.offsets.clear()
+        entries = []
+        with self.pack.open("rb") as f:
+            offset = 0
+            while offset + HEADER.size <= size:
+                f.seek(offset)
+                index, length, _ = HEADER.unpack(f.read(HEADER.size))
+                if offset + HEADER.size + length > size:
+                    break  # truncated record
+                self.offsets[index] = offset
+                entries.append(ENTRY.pack(index, offset))
+                offset += HEADER.size + length
+        if offset < size:
+            with self.pack.open("r+b") as f:
+                f.truncate(offset)
+        self.index.write_bytes(b"".join(entries))
+        self.__drop_deleted()
+
+    def __drop_deleted(self: "PackStore") -> None:
+        """Forget the chapters whose last record is a deleted record."""
+        if not self.offsets:
+            return
+        with self.pack.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with mm:
+            for index, offset in list(self.offsets.items()):
+                if HEADER.unpack_from(mm, offset)[2] == DELETED:
+                    del self.offsets[index]
+
+
+def hash_text(text: str) -> str:
+    """Hash the text of a chapter."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def open_store(
+    raw: Path,
+    default: str = "directory",
+    *,
+    compress: bool = False,
+    samples: int = 32,
+) -> ChapterStore:
+    """Open the chapter store of a raw directory.
+
+    Parameters
+    ----------
+    raw : Path
+        Path of raw directory.
+    default : str, optional
+        Kind of the store if the directory has no pack: "directory" or
+        "pack", by default "directory".
+    compress : bool, optional
+        If specified, compress the chapters written to a pack, by default
+        False.
+    samples : int, optional
+        Number of chapters that train the dictionary, by default 32.
+
+    Returns
+    -------
+    ChapterStore
+        A PackStore if the directory has a pack, a DirectoryStore otherwise.
+    """
+    if (raw / PACK).exists() or default == "pack":
+        return PackStore(raw, compress=compress, samples=samples)
+    return DirectoryStore(raw)
+
+
+def pack_directory(raw: Path, *, compress: bool = False) -> int:
+    """Move the chapter files of a raw directory to its pack.
+
+    Parameters
+    ----------
+    raw : Path
+        Path of raw directory.
+    compress : bool, optional
+        If specified, compress the chapters, by default False.
+
+    Returns
+    -------
+    int
+        Number of packed chapters.
+    """
+    files = DirectoryStore(raw)
+    indexes = files.chapters()
+    with PackStore(raw, compress=compress) as pack:
+        for index in indexes:
+            pack.write(index, files.read(index))
+    for index in indexes:
+        (raw / f"{index}.txt").unlink()
+    _logger.info("Packed %s chapters in %s", len(indexes), raw / PACK)
+    return len(indexes)
+
+
+def unpack_directory(raw: Path) -> int:
+    """Move the chapters of the pack of a raw directory to chapter files.
+
+    Parameters
+    ----------
+    raw : Path
+        Path of raw directory.
+
+    Returns
+    -------
+    int
+        Number of unpacked chapters.
+    """
+    with DirectoryStore(raw) as files, PackStore(raw) as pack:
+        indexes = pack.chapters()
+        for index in indexes:
+            files.write(index, pack.read(index))
+    (raw / PACK).unlink()
+    (raw / INDEX).unlink(missing_ok=True)
+    (raw / DICT).unlink(missing_ok=True)
+    _logger.info("Unpacked %s chapters in %s", len(indexes), raw)
+    return len(indexes)
@@ -0,0 +1,140 @@
+"""Render the templates of the EPUB.
+
+A template is split once into its literal parts and its ``{field}`` slots.
+Rendering copies the parts to a list, fills the slots and joins the list, the
+template is never read nor parsed again. :meth:`Template.stream` gives the
+pieces one by one, a field can then be a long list of lines that is written
+without being joined in memory.
+
+:func:`escape` escapes a whole chapter at once. :func:`html.escape` calls
+``str.replace`` five times, which copies a long non-ASCII text even when the
+character is not in it, a membership test first is much faster.
+
+"""
+
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from importlib.resources import files
+from pathlib import Path
+from string import Formatter
+
+from getnovel import data
+
+TEMPLATE = Path(str(files(data).joinpath("template")))
+ESCAPES = (  # same as html.escape, & first
+    ("&", "&amp;"),
+    ("<", "&lt;"),
+    (">", "&gt;"),
+    ('"', "&quot;"),
+    ("'", "&#x27;"),
+)
+
+
+class Template:
+    """A template split in literal parts and slots.
+
+    Attributes
+    ----------
+    parts : list[str]
+        Literal parts, a slot is an empty part.
+    slots : list[tuple[int, str]]
+        Position in parts and name of the field of every slot.
+    """
+
+    def __init__(self: "Template", text: str) -> None:
+        """Split a template.
+
+        Parameters
+        ----------
+        text : str
+            The template, in the syntax of :meth:`str.format` without format
+            specs.
+        """
+        self.parts: list[str] = []
+        self.slots: list[tuple[int, str]] = []
+        for literal, name, _, _ in Formatter().parse(text):
+            if literal:
+                self.parts.append(literal)
+            if name is not None:
+                self.slots.append((len(self.parts), name))
+                self.parts.append("")
+
+    def render(self: "Template", **fields: object) -> str:
+        """Render the template.
+
+        Parameters
+        ----------
+        fields : object
+            Value of every field.
+
+        Returns
+        -------
+        str
+            The document.
+        """
+        out = self.parts.copy()
+        for position, name in self.slots:
+            out[position] = str(fields[name])
+        return "".join(out)
+
+    def stream(
+        self: "Template",
+        fields: dict[str, object],
+        lists: dict[str, Iterable[str]] | None = None,
+        separators: dict[str, str] | None = None,
+    ) -> Iterator[str]:
+        """Render the template piece by piece.
+
+        Parameters
+        ----------
+        fields : dict[str, object]
+            Value of the fields that are not lists.
+        lists : dict[str, Iterable[str]] | None, optional
+            Lines of the list fields, they are never joined in memory.
+        separators : dict[str, str] | None, optional
+            Separator of the lines of a list, by default a new line.
+
+        Yields
+        ------
+        str
+            Pieces of the document.
+        """
+        lists = lists or {}
+        separators = separators or {}
+        names = dict(self.slots)
+        for position, part in enumerate(self.parts):
+            name = names.get(position)
+            if name is None:
+                yield part
+            elif name in lists:
+                separator = separators.get(name, "\n")
+                for n, line in enumerate(lists[name]):
+                    yield separator + line if n else line
+            else:
+                yield str(fields[name])
+
+
+@lru_cache
+def load_template(name: str) -> Template:
+    """Load a template of the EPUB once.
+
+    Parameters
+    ----------
+    name : str
+        Path of the template in the template directory, like
+        ``OEBPS/content.opf``.
+
+    Returns
+    -------
+    Template
+        The split template.
+    """
+    return Template((TEMPLATE / name).read_text(encoding="utf-8"))
+
+
+def escape(text: str) -> str:
+    """Escape a text like :func:`html.escape`, only replace what it holds."""
+    for char, entity in ESCAPES:
+        if char in text:
+            text = text.replace(char, entity)
+    return text